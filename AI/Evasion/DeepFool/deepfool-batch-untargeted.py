@@ -89,6 +89,114 @@ stats = analyze_model_confidence(model, test_loader, device=device, num_samples=
 
 
 ### DeepFool attack implementation
+def logit_jacobian(net: nn.Module, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Logits and their input gradients for a whole batch from one forward pass.
+
+    Samples are independent, so the gradient of a class logit summed over the
+    batch gives every sample's gradient for that class in one backward pass.
+
+    Args:
+        net (nn.Module): Target neural network in evaluation mode
+        x (torch.Tensor): Input batch of shape (N, C, H, W)
+
+    Returns:
+        Tuple containing:
+            - jacobian (torch.Tensor): Shape (N, num_logits, C*H*W)
+            - logits (torch.Tensor): Shape (N, num_logits)
+    """
+    x = x.detach().requires_grad_(True)
+    fs = net(x)
+    grads = [
+        torch.autograd.grad(fs[:, k].sum(), x, retain_graph=k < fs.shape[1] - 1)[0]
+        for k in range(fs.shape[1])
+    ]
+    return torch.stack(grads, dim=1).flatten(start_dim=2), fs.detach()
+
+
+def deepfool_batch(images: torch.Tensor,
+                   net: nn.Module,
+                   num_classes: int = 10,
+                   overshoot: float = 0.02,
+                   max_iter: int = 50) -> Tuple[torch.Tensor, Tensor, Tensor, Tensor, torch.Tensor]:
+    """
+    Run DeepFool on a whole batch, one Jacobian call per iteration.
+
+    All logit gradients of the still-active samples come from a single
+    logit_jacobian call, and the linearized distance to every candidate
+    boundary is computed as one tensor op. Samples whose prediction has
+    flipped drop out of the active set.
+
+    Args:
+        images (torch.Tensor): Input batch of shape (N, C, H, W)
+        net (nn.Module): Target neural network in evaluation mode
+        num_classes (int): Number of top-scoring classes to consider (default: 10)
+        overshoot (float): Overshoot parameter for boundary crossing (default: 0.02)
+        max_iter (int): Maximum iterations before terminating (default: 50)
+
+    Returns:
+        Tuple containing:
+            - r_tot (torch.Tensor): Accumulated perturbations, shape (N, C, H, W)
+            - loop_i (Tensor): Iterations performed per sample, shape (N,)
+            - label (Tensor): Original predicted classes, shape (N,)
+            - k_i (Tensor): Final adversarial classes, shape (N,)
+            - pert_image (torch.Tensor): Final perturbed images, shape (N, C, H, W)
+    """
+    image = images.detach()
+    n = image.shape[0]
+
+    # Original prediction and candidate classes (descending score)
+    with torch.no_grad():
+        f_image = net(image)
+    I = f_image.argsort(dim=1, descending=True)[:, :num_classes]
+    label = I[:, 0]
+    candidates = I[:, 1:]
+
+    # Working tensors and per-sample accumulators
+    pert_image = image.clone()
+    r_tot = torch.zeros_like(image)
+    loop_i = torch.zeros(n, dtype=torch.long, device=image.device)
+    k_i = label.clone()
+    active = torch.ones(n, dtype=torch.bool, device=image.device)
+
+    for _ in range(max_iter):
+        idx = torch.nonzero(active).squeeze(1)
+        if idx.numel() == 0:
+            break
+
+        # Gradients of every logit and the logits themselves at x
+        jac, fs = logit_jacobian(net, pert_image[idx])
+
+        # Stop samples whose prediction changed
+        k_i[idx] = fs.argmax(dim=1)
+        still = k_i[idx] == label[idx]
+        active[idx[~still]] = False
+        idx, jac, fs = idx[still], jac[still], fs[still]
+        if idx.numel() == 0:
+            break
+
+        # Direction and distance to every candidate boundary under linearization
+        rows = torch.arange(idx.numel(), device=image.device)
+        cand = candidates[idx]
+        lab = label[idx]
+        w_k = jac[rows[:, None], cand] - jac[rows, lab][:, None]
+        f_k = fs.gather(1, cand) - fs.gather(1, lab[:, None])
+        w_norm = w_k.norm(dim=2)
+        pert_k = f_k.abs() / (w_norm + 1e-10)
+
+        # Minimal step for the closest boundary
+        pert, best = pert_k.min(dim=1)
+        w = w_k[rows, best]
+        r_i = ((pert + 1e-4) / (w_norm[rows, best] + 1e-10))[:, None] * w
+        r_tot[idx] = r_tot[idx] + r_i.view_as(r_tot[idx])
+
+        # Apply with overshoot to ensure crossing
+        pert_image[idx] = image[idx] + (1 + overshoot) * r_tot[idx]
+        loop_i[idx] += 1
+
+    return r_tot, loop_i, label, k_i, pert_image
+
+
 def deepfool(image: torch.Tensor,
              net: nn.Module,
              num_classes: int = 10,
@@ -98,6 +206,8 @@ def deepfool(image: torch.Tensor,
     """
     Generate minimal adversarial perturbation using DeepFool algorithm.
 
+    Single-image wrapper around deepfool_batch.
+
     Args:
         image (torch.Tensor): Input image tensor of shape (1, C, H, W)
         net (nn.Module): Target neural network in evaluation mode
@@ -114,77 +224,17 @@ def deepfool(image: torch.Tensor,
             - k_i (int): Final adversarial class
             - pert_image (torch.Tensor): Final perturbed image
     """
-    image = image.to(device)
-    net = net.to(device)
-    
-    # Original prediction and class ordering (descending score)
-    f_image = net(image).data.cpu().numpy().flatten()
-    I = f_image.argsort()[::-1]
-    label = I[0]
-    
-    # Working tensors and accumulators
-    input_shape = image.shape
-    pert_image = image.clone()
-    r_tot = torch.zeros(input_shape).to(device)
-    loop_i = 0
-    
-    # Iterate until a successful perturbation is found or the limit is reached
-    while loop_i < max_iter:
-        x = pert_image.clone().requires_grad_(True)
-        fs = net(x)
-        # Current top prediction at x
-        k_i = fs.data.cpu().numpy().flatten().argsort()[::-1][0]
-
-        # Stop when the prediction changes
-        if k_i != label:
-            break
-
-        # Initialize the best candidate step for this iteration
-        pert = float('inf')
-        w = None
-        
-        # Search minimal step among candidate classes
-        for k in range(1, num_classes):
-            if I[k] == label:
-                continue
-            
-            # Compute gradient for candidate class
-            if x.grad is not None:
-                x.grad.zero_()
-            fs[0, I[k]].backward(retain_graph=True)
-            grad_k = x.grad.data.clone()
-            
-            # Compute gradient for original class
-            if x.grad is not None:
-                x.grad.zero_()
-            fs[0, label].backward(retain_graph=True)
-            grad_label = x.grad.data.clone()
-            
-            # Direction and distance under linearization
-            w_k = grad_k - grad_label
-            f_k = (fs[0, I[k]] - fs[0, label]).data.cpu().numpy()
-            pert_k = abs(f_k) / (torch.norm(w_k.flatten()) + 1e-10)
-            
-            if pert_k < pert:
-                pert = pert_k
-                w = w_k
-                
-        # Minimal step for the selected direction
-        r_i = (pert + 1e-4) * w / (torch.norm(w.flatten()) + 1e-10)
-        r_tot = r_tot + r_i
-
-        # Apply with overshoot to ensure crossing
-        pert_image = image + (1 + overshoot) * r_tot
-        loop_i += 1
-
-    return r_tot, loop_i, label, k_i, pert_image
+    r_tot, loop_i, label, k_i, pert_image = deepfool_batch(
+        image.to(device), net.to(device), num_classes, overshoot, max_iter
+    )
+    return r_tot, int(loop_i[0]), int(label[0]), int(k_i[0]), pert_image
 
 
 # Batch attack
 num_examples = 30
 print(f"\nGenerating {num_examples} adversarial examples using DeepFool...")
 
-_, test_loader = get_mnist_loaders(batch_size=1, normalize=True)
+_, test_loader = get_mnist_loaders(batch_size=num_examples, normalize=True)
 model.eval()
 
 results = []
@@ -194,17 +244,19 @@ print(f"Test loader ready with {len(test_loader.dataset)} samples")
 print(f"Will process first {num_examples} samples")
 print("Starting batch attack generation...")
 
-# Execute DeepFool on a batch of samples and collect results
-for idx, (data, target) in enumerate(test_loader):
-    if idx >= num_examples:
-        break
+# Execute DeepFool on the whole batch at once
+data, target = next(iter(test_loader))
+data = data.to(device)
 
-    data = data.to(device)
+r, iterations, orig_labels, adv_labels, pert_images = deepfool_batch(
+    data, model, num_classes=10, overshoot=0.02, max_iter=50
+)
 
-    # Execute DeepFool attack
-    r, iterations, orig_label, adv_label, pert_image = deepfool(
-        data, model, num_classes=10, overshoot=0.02, max_iter=50, device=device
-    )
+# Collect per-sample results
+for idx in range(data.shape[0]):
+    orig_label = int(orig_labels[idx])
+    adv_label = int(adv_labels[idx])
+    r_idx = r[idx:idx+1].cpu()
 
     # Track success and store metrics
     success = (orig_label != adv_label)
@@ -212,20 +264,20 @@ for idx, (data, target) in enumerate(test_loader):
         success_count += 1
 
     results.append({
-        'original_image': data.cpu(),
-        'perturbation': r.cpu(),
-        'perturbed_image': pert_image.cpu(),
+        'original_image': data[idx:idx+1].cpu(),
+        'perturbation': r_idx,
+        'perturbed_image': pert_images[idx:idx+1].cpu(),
         'original_label': orig_label,
         'adversarial_label': adv_label,
-        'iterations': iterations,
-        'true_label': target.item(),
-        'l2_norm': torch.norm(r.cpu()).item(),
+        'iterations': int(iterations[idx]),
+        'true_label': target[idx].item(),
+        'l2_norm': torch.norm(r_idx).item(),
         'success': success
     })
 
     # Progress feedback
-    print(f"  Example {idx+1}: True={target.item()}, Orig={orig_label}, "
-          f"Adv={adv_label}, Iter={iterations}, L2={torch.norm(r.cpu()).item():.4f}")
+    print(f"  Example {idx+1}: True={target[idx].item()}, Orig={orig_label}, "
+          f"Adv={adv_label}, Iter={int(iterations[idx])}, L2={torch.norm(r_idx).item():.4f}")
     
 print(f"\nAttack Success Rate: {success_count}/{num_examples} "
       f"({100*success_count/num_examples:.1f}%)")
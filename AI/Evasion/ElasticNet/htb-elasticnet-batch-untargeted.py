@@ -318,7 +318,7 @@ def fista_step(
         clip_max (float): Maximum valid pixel value
 
     Returns:
-        tuple: (new_adv_images, new_y_momentum, loss_value, distances)
+        tuple: (new_adv_images, new_y_momentum, loss_per_example, distances)
     """
     # Ensure y_momentum requires gradients for backprop
     y_momentum = y_momentum.detach().requires_grad_(True)
@@ -354,7 +354,7 @@ def fista_step(
     # Update momentum point for next iteration
     y_new_momentum = adv_new + momentum_coef * (adv_new - adv_images)
 
-    return adv_new, y_new_momentum, total_loss_summed.item(), distances
+    return adv_new, y_new_momentum, total_loss.detach(), distances
 
 def check_attack_success(adv_images, labels, model, targeted=False):
     """
@@ -400,20 +400,18 @@ def update_binary_search_bounds(lower_bound, upper_bound, const, success_mask):
     Returns:
         tuple: (new_lower_bound, new_upper_bound, new_const)
     """
-    # Process each example individually
-    for i in range(len(success_mask)):
-        if success_mask[i]:
-            # Success: try smaller c
-            upper_bound[i] = min(upper_bound[i], const[i])
-            if upper_bound[i] < 1e10:
-                const[i] = (lower_bound[i] + upper_bound[i]) / 2
-        else:
-            # Failure: need larger c
-            lower_bound[i] = max(lower_bound[i], const[i])
-            if upper_bound[i] < 1e10:
-                const[i] = (lower_bound[i] + upper_bound[i]) / 2
-            else:
-                const[i] *= 10  # Exponential increase for persistent failures
+    # Success: try smaller c
+    upper_bound = torch.where(success_mask, torch.minimum(upper_bound, const), upper_bound)
+    # Failure: need larger c
+    lower_bound = torch.where(success_mask, lower_bound, torch.maximum(lower_bound, const))
+
+    # Bisect once an upper bound is known, otherwise grow c exponentially
+    # for persistent failures
+    const = torch.where(
+        upper_bound < 1e10,
+        (lower_bound + upper_bound) / 2,
+        torch.where(success_mask, const, const * 10),
+    )
 
     return lower_bound, upper_bound, const
 
@@ -425,6 +423,7 @@ config = {
     "learning_rate": 0.01,  # FISTA step size
     "max_iterations": 1000,  # FISTA iterations per binary search
     "binary_search_steps": 5,  # Number of binary search iterations
+    "abort_early": True,  # Retire adversarial examples once their loss plateaus
     "initial_const": 0.001,  # Starting trade-off constant
     "clip_min": 0.0,  # Minimum pixel value
     "clip_max": 1.0,  # Maximum pixel value
@@ -472,6 +471,12 @@ const = torch.ones(batch_size).to(device) * config["initial_const"]
 best_adv = original_images.clone()
 best_l2 = torch.ones(batch_size).to(device) * 1e10
 
+# FISTA iterations actually run per example, summed over binary search steps
+total_iterations = torch.zeros(batch_size, dtype=torch.long).to(device)
+
+# Plateau checks happen every 10% of the iteration budget (as in C&W)
+check_every = max(config["max_iterations"] // 10, 1)
+
 # Binary search over trade-off constant c
 for binary_step in range(config["binary_search_steps"]):
     print(f"Binary search step {binary_step + 1}/{config['binary_search_steps']}")
@@ -480,15 +485,20 @@ for binary_step in range(config["binary_search_steps"]):
     adv_images = original_images.clone().detach()
     y_momentum = adv_images.clone()
 
+    # Examples still being optimized and their loss at the last plateau check
+    active = torch.arange(batch_size).to(device)
+    prev_loss = torch.full((batch_size,), float("inf")).to(device)
+    iterations_run = torch.zeros(batch_size, dtype=torch.long).to(device)
+
     # FISTA optimization loop
     for iteration in range(config["max_iterations"]):
-        # Perform one FISTA step
-        adv_images, y_momentum, loss, distances = fista_step(
-            adv_images,
-            y_momentum,
-            original_images,
-            labels_onehot,
-            const,
+        # Perform one FISTA step on the active examples only
+        adv_active, y_active, loss, distances = fista_step(
+            adv_images[active],
+            y_momentum[active],
+            original_images[active],
+            labels_onehot[active],
+            const[active],
             model,
             config["beta"],
             config["learning_rate"],
@@ -498,6 +508,21 @@ for binary_step in range(config["binary_search_steps"]):
             clip_min=config["clip_min"],
             clip_max=config["clip_max"],
         )
+        adv_images[active] = adv_active.detach()
+        y_momentum[active] = y_active.detach()
+        iterations_run[active] += 1
+
+        if config["abort_early"] and (iteration + 1) % check_every == 0:
+            # Retire examples that already fool the model and whose loss
+            # stopped decreasing since the last check
+            fooled = check_attack_success(
+                adv_active, attack_targets[active], model, targeted=False
+            )
+            converged = fooled & (loss > prev_loss[active] * 0.9999)
+            prev_loss[active] = loss
+            active = active[~converged]
+            if len(active) == 0:
+                break
 
     # Check which examples successfully fooled the model
     success_mask = check_attack_success(
@@ -509,10 +534,9 @@ for binary_step in range(config["binary_search_steps"]):
         adv_images, original_images, config["beta"]
     )
 
-    for i in range(batch_size):
-        if success_mask[i] and l2_dist[i] < best_l2[i]:
-            best_adv[i] = adv_images[i]
-            best_l2[i] = l2_dist[i]
+    improved = success_mask & (l2_dist.detach() < best_l2)
+    best_l2 = torch.where(improved, l2_dist.detach(), best_l2)
+    best_adv = torch.where(improved.view(-1, 1, 1, 1), adv_images.detach(), best_adv)
 
     # Update binary search bounds
     lower_bound, upper_bound, const = update_binary_search_bounds(
@@ -520,8 +544,14 @@ for binary_step in range(config["binary_search_steps"]):
     )
 
     # Progress reporting
+    total_iterations += iterations_run
     num_success = success_mask.sum().item()
-    print(f"  Successfully generated {num_success}/{batch_size} adversarial examples\n")
+    print(f"  Successfully generated {num_success}/{batch_size} adversarial examples")
+    print(
+        f"  FISTA iterations per example: mean {iterations_run.float().mean().item():.0f}, "
+        f"min {iterations_run.min().item()}, max {iterations_run.max().item()} "
+        f"(budget {config['max_iterations']})\n"
+    )
     
 # ---------- Computing & Analyzing Results ----------
 # Evaluate final adversarial examples
@@ -550,6 +580,10 @@ print(f"Average L1 Distortion: {l1_dist.mean().item():.4f}")
 print(f"Average Squared L2 Distortion: {l2_dist.mean().item():.4f}")
 print(f"Average L∞ Distortion: {linf_dist.mean().item():.4f}")
 print(f"Average Elastic Distortion: {elastic_dist.mean().item():.4f}")
+print(
+    f"Average FISTA Iterations: {total_iterations.float().mean().item():.0f}"
+    f"/{config['max_iterations'] * config['binary_search_steps']}"
+)
 print("=" * 60)
 
 # ---------- Attack Process Visualization ----------
@@ -200,12 +200,6 @@ def mnist_b64_from_x01(x2d: np.ndarray) -> str:
     return base64.b64encode(buf.getvalue()).decode("ascii")
 
 
-def mnist_roundtrip_4d(x4d: np.ndarray) -> np.ndarray:
-    x2d = x4d[0, 0]
-    q2d = mnist_x01_from_b64(mnist_b64_from_x01(x2d))
-    return q2d[None, None, ...].astype(np.float32)
-
-
 def count_mnist_l0(a4d: np.ndarray, b4d: np.ndarray, threshold: float = 1e-6) -> int:
     return int(np.sum(np.abs(a4d[0, 0] - b4d[0, 0]) > threshold))
 
@@ -227,6 +221,92 @@ def mnist_project_topk(x0: np.ndarray, cand: np.ndarray, budget: int) -> np.ndar
     return out.reshape(cand.shape).astype(np.float32)
 
 
+# ---------------------------------------------------------------------
+# Quantize-and-repair
+# ---------------------------------------------------------------------
+
+def quantize_x01(x: np.ndarray) -> np.ndarray:
+    """Snap [0,1] images to the uint8 grid, exactly as the PNG round trip does."""
+    x255 = np.clip(np.round(x * 255.0), 0, 255).astype(np.uint8)
+    return x255.astype(np.float32) / 255.0
+
+
+def repair_variants(x0: np.ndarray, cand: np.ndarray, quant: np.ndarray, max_repair: int) -> List[np.ndarray]:
+    """Restore perturbations that quantization rounded away, largest first.
+
+    Each dropped pixel is pushed one grey level from x0 in the direction the
+    attack moved it. Variants restore growing prefixes (1, 2, 4, ...) of the
+    dropped pixels, capped at max_repair.
+    """
+    delta = (cand - x0).reshape(-1)
+    dropped = np.flatnonzero((np.abs(delta) > 1e-6) & (quant.reshape(-1) == x0.reshape(-1)))
+    if dropped.size == 0:
+        return []
+
+    dropped = dropped[np.argsort(-np.abs(delta[dropped]), kind="stable")][:max_repair]
+
+    variants = []
+    k = 1
+    while True:
+        k = min(k, dropped.size)
+        idx = dropped[:k]
+        out = quant.reshape(-1).copy()
+        out[idx] = x0.reshape(-1)[idx] + np.sign(delta[idx]) / 255.0
+        variants.append(quantize_x01(out.reshape(quant.shape)))
+        if k == dropped.size:
+            return variants
+        k *= 2
+
+
+def quantize_and_repair(
+    classifier: PyTorchClassifier,
+    x0: np.ndarray,
+    cands: np.ndarray,
+    target: int,
+    max_l0: Optional[int] = None,
+    max_l2: Optional[float] = None,
+    min_l2: Optional[float] = None,
+    max_linf: Optional[float] = None,
+    max_repair: int = 16,
+) -> Tuple[Optional[int], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Quantize a batch of float adversarials and pick the first that still works.
+
+    All quantized candidates, followed by their repair variants, are checked
+    in one batched forward pass against the target and every given budget.
+    A repaired pixel sits 1/255 from x0, so repairs only raise L-inf when
+    quantization dropped the whole perturbation; max_linf is checked anyway.
+    Returns (index of the first passing image or None, checked batch,
+    predictions, L0, L2), so callers can report on any of them.
+    """
+    cands = np.clip(cands, 0.0, 1.0).astype(np.float32)
+    quant = quantize_x01(cands)
+
+    batch = list(quant)
+    for cand, q in zip(cands, quant):
+        batch.extend(repair_variants(x0[0], cand, q, max_repair))
+    batch = np.stack(batch)
+
+    preds = np.argmax(classifier.predict(batch, batch_size=len(batch)), axis=1)
+    diff = (batch - x0).reshape(len(batch), -1)
+    l0 = np.count_nonzero(np.abs(diff) > 1e-6, axis=1)
+    l2 = np.linalg.norm(diff, axis=1)
+    linf = np.max(np.abs(diff), axis=1)
+
+    ok = preds == target
+    if max_l0 is not None:
+        ok &= l0 <= max_l0
+    if max_l2 is not None:
+        ok &= l2 <= max_l2
+    if min_l2 is not None:
+        ok &= l2 >= min_l2
+    if max_linf is not None:
+        ok &= linf <= max_linf + 1e-6
+
+    hits = np.flatnonzero(ok)
+    choice = int(hits[0]) if hits.size else None
+    return choice, batch, preds, l0, l2
+
+
 # ---------------------------------------------------------------------
 # CIFAR model
 # ---------------------------------------------------------------------
@@ -437,33 +517,21 @@ def ensure_cifar_min_l2(
     target: int,
     min_l2: float,
 ) -> Optional[np.ndarray]:
-    cand = np.clip(cifar_roundtrip(cand), 0.0, 1.0).astype(np.float32)
-
-    pred = local_pred(classifier, cand)
-    dist = l2_distance(x0, cand)
-
-    if pred == target and dist >= min_l2:
-        return cand
-
-    if pred != target:
-        return None
+    cand = quantize_x01(np.clip(cand, 0.0, 1.0))
 
-    diff = cand - x0
+    # The candidate itself, then scaled-up copies that clear min_l2; all of
+    # them are quantized and checked in one forward pass
+    trials = [cand]
     base = l2_distance(x0, cand)
 
-    if base < 1e-9:
-        return None
-
-    start = max(1.05, (min_l2 / base) * 1.05)
-
-    for scale in np.linspace(start, 4.0, 20):
-        trial = np.clip(x0 + diff * scale, 0.0, 1.0).astype(np.float32)
-        trial = cifar_roundtrip(trial)
+    if base >= 1e-9:
+        diff = cand - x0
+        start = max(1.05, (min_l2 / base) * 1.05)
+        for scale in np.linspace(start, 4.0, 20):
+            trials.append(np.clip(x0 + diff * scale, 0.0, 1.0))
 
-        if local_pred(classifier, trial) == target and l2_distance(x0, trial) >= min_l2:
-            return trial
-
-    return None
+    choice, batch, _, _, _ = quantize_and_repair(classifier, x0, np.concatenate(trials), target, min_l2=min_l2)
+    return None if choice is None else batch[choice][None, ...]
 
 
 def try_cifar_ead(
@@ -659,31 +727,13 @@ def solve_cifar(host: str, ch: Dict[str, Any], args: argparse.Namespace, device:
 # MNIST ART JSMA
 # ---------------------------------------------------------------------
 
-def validate_mnist_candidate(
-    classifier: PyTorchClassifier,
-    x0: np.ndarray,
-    cand: np.ndarray,
-    target: int,
-    budget: int,
-    max_l2: float,
-) -> Tuple[bool, np.ndarray, int, float, int]:
-    cand = np.clip(cand, 0.0, 1.0).astype(np.float32)
-    cand = mnist_roundtrip_4d(cand)
-
-    pred = local_pred(classifier, cand)
-    l0 = count_mnist_l0(x0, cand)
-    dist = l2_distance(x0, cand)
-
-    ok = pred == target and l0 <= budget and dist <= max_l2
-    return ok, cand, pred, l0, dist
-
-
 def try_mnist_jsma(
     classifier: PyTorchClassifier,
     x: np.ndarray,
     target: int,
     budget: int,
     max_l2: float,
+    max_linf: Optional[float] = None,
 ) -> Optional[np.ndarray]:
     y = one_hot(target)
 
@@ -720,14 +770,20 @@ def try_mnist_jsma(
             # Strictly keep at most budget pixels, in case PNG round-trip or ART exceeds it.
             adv = mnist_project_topk(x, adv, budget)
 
-            ok, q, pred, l0, dist = validate_mnist_candidate(
-                classifier, x, adv, target, budget, max_l2
+            # One forward over the quantized candidate (index 0) and its repairs
+            choice, batch, preds, l0, dist = quantize_and_repair(
+                classifier, x, adv, target, max_l0=budget, max_l2=max_l2, max_linf=max_linf
             )
 
-            print(f"        pred={pred}, L0={l0}/{budget}, L2={dist:.4f}/{max_l2:.4f}")
+            print(f"        pred={preds[0]}, L0={l0[0]}/{budget}, L2={dist[0]:.4f}/{max_l2:.4f}")
 
-            if ok:
-                return q
+            if choice is not None:
+                if choice > 0:
+                    print(
+                        f"        repaired after quantization: pred={preds[choice]}, "
+                        f"L0={l0[choice]}/{budget}, L2={dist[choice]:.4f}"
+                    )
+                return batch[choice][None, ...]
 
         except Exception as exc:
             print(f"    [!] MNIST JSMA error: {exc}")
@@ -764,6 +820,7 @@ def solve_mnist(host: str, ch: Dict[str, Any], args: argparse.Namespace, device:
     original_label = int(ch.get("original_label", -1))
     budget = int(ch["l0_budget"])
     max_l2 = float(ch["max_l2"])
+    max_linf = float(ch["max_linf"]) if "max_linf" in ch else None
 
     model = load_mnist_model(host, device, args.mnist_weights)
     wrapped = MNISTNormalizedWrapper(model).to(device).eval()
@@ -775,7 +832,7 @@ def solve_mnist(host: str, ch: Dict[str, Any], args: argparse.Namespace, device:
         f"target={target}, L0_budget={budget}, max_l2={max_l2}"
     )
 
-    adv = try_mnist_jsma(classifier, x, target, budget, max_l2)
+    adv = try_mnist_jsma(classifier, x, target, budget, max_l2, max_linf)
 
     if adv is None:
         raise RuntimeError("Could not craft a valid MNIST JSMA adversarial example")
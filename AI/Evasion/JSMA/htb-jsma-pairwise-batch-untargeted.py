@@ -1,6 +1,7 @@
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.func import jacrev, vmap
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
@@ -69,16 +70,24 @@ grad_class0 = compute_class_gradient(x_test, model_test, 0, wrt='logits')
 print(f"Gradient shape: {grad_class0.shape}")
 print(f"Gradient for class 0: {grad_class0}")
 
+def compute_batch_jacobian(x, model, num_classes=10, wrt='logits'):
+    # One batched forward pass; vmap runs the num_classes backward passes
+    # together instead of one forward+backward per class
+    def class_scores(x_single):
+        logits = model(x_single.unsqueeze(0))
+        if wrt != 'logits':
+            logits = F.softmax(logits, dim=1)
+        return logits[0, :num_classes]
+
+    jacobian = vmap(jacrev(class_scores))(x.detach())
+    return jacobian.detach().flatten(start_dim=2)  # (N, num_classes, features), stays on device
+
 def compute_jacobian_matrix(x, model, num_classes=10, wrt='logits'):
     if x.shape[0] != 1:
         raise ValueError("compute_jacobian_matrix expects batch size 1")
 
-    jacobian = []
-    for class_idx in range(num_classes):
-        grad = compute_class_gradient(x, model, class_idx, wrt)
-        jacobian.append(grad)
-
-    return np.asarray(jacobian)
+    jacobian = compute_batch_jacobian(x, model, num_classes, wrt)[0]
+    return jacobian.cpu().numpy()
 
 # MNIST example: 1×1×28×28 input, 10 classes
 # Jacobian should be (10, 784)
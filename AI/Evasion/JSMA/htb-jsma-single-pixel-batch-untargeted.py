@@ -1,6 +1,7 @@
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.func import jacrev, vmap
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
@@ -69,16 +70,24 @@ grad_class0 = compute_class_gradient(x_test, model_test, 0, wrt='logits')
 print(f"Gradient shape: {grad_class0.shape}")
 print(f"Gradient for class 0: {grad_class0}")
 
+def compute_batch_jacobian(x, model, num_classes=10, wrt='logits'):
+    # One batched forward pass; vmap runs the num_classes backward passes
+    # together instead of one forward+backward per class
+    def class_scores(x_single):
+        logits = model(x_single.unsqueeze(0))
+        if wrt != 'logits':
+            logits = F.softmax(logits, dim=1)
+        return logits[0, :num_classes]
+
+    jacobian = vmap(jacrev(class_scores))(x.detach())
+    return jacobian.detach().flatten(start_dim=2)  # (N, num_classes, features), stays on device
+
 def compute_jacobian_matrix(x, model, num_classes=10, wrt='logits'):
     if x.shape[0] != 1:
         raise ValueError("compute_jacobian_matrix expects batch size 1")
 
-    jacobian = []
-    for class_idx in range(num_classes):
-        grad = compute_class_gradient(x, model, class_idx, wrt)
-        jacobian.append(grad)
-
-    return np.asarray(jacobian)
+    jacobian = compute_batch_jacobian(x, model, num_classes, wrt)[0]
+    return jacobian.cpu().numpy()
 
 # MNIST example: 1×1×28×28 input, 10 classes
 # Jacobian should be (10, 784)
@@ -191,6 +200,73 @@ print(f"Pixel values:   {x_toy.flatten().numpy()}")
 print(f"Updated mask:   {updated_mask}")
 print(f"Remaining pixels: {updated_mask.sum()}/4")
 
+def jsma_batch_attack(x, target_classes, model, theta, gamma, max_iter, wrt='logits',
+                      clip_min=0.0, clip_max=1.0, num_classes=10):
+    # Attack N images together: per-sample search space, budget and done-mask,
+    # one Jacobian call per iteration for the samples that are still active
+    x_adv = x.clone().detach()
+    n = x_adv.shape[0]
+    x_flat = x_adv.view(n, -1)
+    num_features = x_flat.shape[1]
+    max_pixels = int(gamma * num_features)
+
+    targets = torch.as_tensor(target_classes, device=x_adv.device)
+    search_space = torch.ones(n, num_features, dtype=torch.bool, device=x_adv.device)
+    pixels_mod = torch.zeros(n, dtype=torch.long, device=x_adv.device)
+    iterations = torch.zeros(n, dtype=torch.long, device=x_adv.device)
+    done = torch.zeros(n, dtype=torch.bool, device=x_adv.device)
+
+    for _ in range(max_iter):
+        iterations += (~done).long()
+        with torch.no_grad():
+            preds = model(x_adv).argmax(dim=1)
+        done |= (preds == targets) | (pixels_mod >= max_pixels)
+
+        # Retire finished samples from the active set
+        active = torch.nonzero(~done).squeeze(1)
+        if active.numel() == 0:
+            break
+
+        jacobian = compute_batch_jacobian(x_adv[active], model, num_classes, wrt)
+        alpha = jacobian[torch.arange(active.numel(), device=x_adv.device), targets[active]]
+        beta = jacobian.sum(dim=1) - alpha
+        alpha = alpha * search_space[active]
+        beta = beta * search_space[active]
+
+        zeros = torch.zeros_like(alpha)
+        inc_scores = torch.where((alpha > 0) & (beta < 0), alpha * beta.abs(), zeros)
+        dec_scores = torch.where((alpha < 0) & (beta > 0), alpha.abs() * beta, zeros)
+        inc_best, inc_idx = inc_scores.max(dim=1)
+        dec_best, dec_idx = dec_scores.max(dim=1)
+
+        increase = inc_best > dec_best
+        saliency = torch.where(increase, inc_best, dec_best)
+        pixel_idx = torch.where(increase, inc_idx, dec_idx)
+
+        # No salient pixel left: this sample cannot make further progress
+        stalled = saliency <= 0
+        done[active[stalled]] = True
+
+        moving = ~stalled
+        rows = active[moving]
+        cols = pixel_idx[moving]
+        step = torch.where(increase[moving], theta, -theta)
+        x_flat[rows, cols] = (x_flat[rows, cols] + step).clamp(clip_min, clip_max)
+
+        # A sample's first step rescans its whole image, dropping the pixels that
+        # were saturated from the start; after that only the perturbed pixel can
+        # change state, so only that entry is re-checked
+        first = rows[pixels_mod[rows] == 0]
+        search_space[first] &= (x_flat[first] > clip_min + 1e-6) & (x_flat[first] < clip_max - 1e-6)
+        new_vals = x_flat[rows, cols]
+        search_space[rows, cols] &= (new_vals > clip_min + 1e-6) & (new_vals < clip_max - 1e-6)
+        pixels_mod[rows] += 1
+
+    with torch.no_grad():
+        success = model(x_adv).argmax(dim=1) == targets
+
+    return x_adv, success, pixels_mod, iterations
+
 # --- Single-pixel Batch Attack Implementation ---
 print("Collecting samples...")
 samples_found = 0
@@ -241,56 +317,29 @@ results = {
     'iterations': []
 }
 
+# All samples are attacked together; finished ones drop out of the active set
+x_adv_batch, success_batch, pixels_batch, iters_batch = jsma_batch_attack(
+    torch.cat(original_images), target_labels, model,
+    config['theta'], config['gamma'], config['max_iter'], config['wrt'],
+    config['clip_min'], config['clip_max']
+)
+
 for idx in range(len(original_images)):
-    x = original_images[idx]
     orig_class = original_labels[idx]
     tgt_class = target_labels[idx]
+    success = bool(success_batch[idx])
+    pixels_mod = int(pixels_batch[idx])
+    iters = int(iters_batch[idx])
 
-    # Initialize attack state
-    x_adv = x.clone().detach()
-    search_space = initialize_search_space(x.shape)
-    pixels_mod = 0
-
-    # Attack loop
-    for iteration in range(config['max_iter']):
-        if check_target_reached(x_adv, tgt_class, model):
-            break
-        if pixels_mod >= int(config['gamma'] * 784):
-            break
-
-        jacobian = compute_jacobian_matrix(x_adv, model, 10, config['wrt'])
-        alpha = extract_target_gradient(jacobian, tgt_class)
-        beta = extract_other_gradients(jacobian, tgt_class)
-        alpha_masked = apply_search_mask(alpha, search_space)
-        beta_masked = apply_search_mask(beta, search_space)
-
-        inc_scores = score_increase_saliency(alpha_masked, beta_masked)
-        dec_scores = score_decrease_saliency(alpha_masked, beta_masked)
-        pixel_idx, saliency, increase = select_best_direction(inc_scores, dec_scores)
-
-        if saliency <= 0:
-            break
-
-        x_adv = apply_single_pixel_perturbation(
-            x_adv, pixel_idx, config['theta'], increase,
-            config['clip_min'], config['clip_max']
-        )
-
-        search_space = remove_saturated_pixels(search_space, x_adv, 0.0, 1.0)
-        pixels_mod += 1
-        
     # Record results
-    success = check_target_reached(x_adv, tgt_class, model)
-    pred = model(x_adv).argmax(dim=1).item()
-
-    results['adversarial'].append(x_adv)
+    results['adversarial'].append(x_adv_batch[idx:idx+1])
     results['success'].append(success)
     results['pixels_modified'].append(pixels_mod)
-    results['iterations'].append(iteration + 1)
+    results['iterations'].append(iters)
 
     # Display progress
     status = "✓" if success else "✗"
-    print(f"{idx+1:<4} {orig_class}→{tgt_class:<8} {status:<10} {pixels_mod:<8} {iteration+1:<8}")
+    print(f"{idx+1:<4} {orig_class}→{tgt_class:<8} {status:<10} {pixels_mod:<8} {iters:<8}")
 
 print("="*46)
 
@@ -376,7 +425,9 @@ for theta_test in theta_values:
         )
 
         search_space_test[pixel_idx] = False
-        search_space_test = remove_saturated_pixels(search_space_test, x_test, 0.0, 1.0)
+        if pixels_mod == 0:
+            # Saturated pixels only need one full scan; later steps change one pixel
+            search_space_test = remove_saturated_pixels(search_space_test, x_test, 0.0, 1.0)
         pixels_mod += 1
         
     success = check_target_reached(x_test, target_labels[0], model)
@@ -178,6 +178,7 @@ def ead_targeted(
     max_iter: int = 1000,
     decision_rule: str = "EN",
     confidence: float = 0.0,
+    check_every: int = 10,
 ) -> torch.Tensor:
     """Elastic-net Attack with Decision-based (EAD), targeted variant, in [0,1].
 
@@ -185,16 +186,19 @@ def ead_targeted(
     constant `c` to improve targeted success. The best successful example is 
     selected using the decision rule: `EN` chooses the candidate with minimal 
     `(beta * L1 + L2)`, while `L1` chooses minimal `L1` among successful iterates.
+    Iterates are classified every `check_every` FISTA steps (and on the last one);
+    the bookkeeping stays on-device so the loop only syncs with the host there.
     """
     _set_seed()
     x_orig = x01.detach().clone().float()
+    use_l1 = decision_rule.upper() == "L1"
 
     def _run_fista(c_val: float) -> tuple[torch.Tensor, bool, float]:
         adv_curr = x_orig.clone()
         y_mom = adv_curr.clone()
-        best_local = None
-        best_score = float("inf")
-        success = False
+        best_local = x_orig.clone()
+        best_score = torch.tensor(float("inf"), device=x_orig.device)
+        success = torch.tensor(False, device=x_orig.device)
         const = torch.tensor([c_val], device=x_orig.device, dtype=x_orig.dtype)
         for it in range(max_iter):
             y_mom = y_mom.detach().requires_grad_(True)
@@ -202,38 +206,32 @@ def ead_targeted(
             adv_loss = _compute_adversarial_loss(logits, target, confidence)
             l2_sq = torch.sum((y_mom - x_orig) ** 2)
             total = const[0] * adv_loss + l2_sq
-            total.backward()
-            grad = y_mom.grad
-            y_new = y_mom - lr * grad
-            adv_new = _apply_shrinkage_thresholding(y_new, x_orig, lr * beta, 0.0, 1.0)
-            adv_new = torch.clamp(adv_new, 0.0, 1.0)
-            mom = _compute_fista_momentum(it)
-            y_mom = torch.clamp(adv_new + mom * (adv_new - adv_curr), 0.0, 1.0)
-            adv_curr = adv_new
+            # Gradient w.r.t. the input only; skips accumulating parameter grads
+            grad = torch.autograd.grad(total, y_mom)[0]
             with torch.no_grad():
+                y_new = y_mom - lr * grad
+                adv_new = _apply_shrinkage_thresholding(y_new, x_orig, lr * beta, 0.0, 1.0)
+                adv_new = torch.clamp(adv_new, 0.0, 1.0)
+                mom = _compute_fista_momentum(it)
+                y_mom = torch.clamp(adv_new + mom * (adv_new - adv_curr), 0.0, 1.0)
+                adv_curr = adv_new
+                if (it + 1) % check_every != 0 and it != max_iter - 1:
+                    continue
                 logits_adv = model(cifar_normalize(adv_new))
-                pred = int(torch.argmax(logits_adv, dim=1).item())
+                hit = torch.argmax(logits_adv, dim=1)[0] == target
                 diff = adv_new - x_orig
-                l1 = torch.sum(torch.abs(diff)).item()
-                l2 = torch.norm(diff.flatten(), p=2).item()
-                if decision_rule.upper() == "L1":
-                    score = l1
-                else:
-                    score = beta * l1 + l2
-                if pred == target:
-                    success = True
-                    if score < best_score:
-                        best_score = score
-                        best_local = adv_new.clone()
-                if (
-                    it > 100
-                    and pred == target
-                    and torch.softmax(logits_adv, dim=1)[0, target].item() > 0.9
-                ):
+                l1 = torch.sum(torch.abs(diff))
+                score = l1 if use_l1 else beta * l1 + torch.norm(diff.flatten(), p=2)
+                better = hit & (score < best_score)
+                best_score = torch.where(better, score, best_score)
+                best_local = torch.where(better, adv_new, best_local)
+                success = success | hit
+                confident = hit & (torch.softmax(logits_adv, dim=1)[0, target] > 0.9)
+                if it > 100 and bool(confident):
                     break
-        if best_local is None:
+        if not bool(success):
             best_local = adv_curr
-        return best_local.detach(), success, best_score
+        return best_local.detach(), bool(success), float(best_score)
 
     low = 0.0
     high = None
@@ -17,6 +17,7 @@ from PIL import Image
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.func import jacrev
 
 
 MNIST_MEAN = 0.1307
@@ -127,42 +128,28 @@ def load_model(host: str, weights_path: Optional[str] = None) -> MNISTClassifier
 def compute_jacobian(model: nn.Module, x: torch.Tensor) -> torch.Tensor:
     """Compute Jacobian matrix for all classes with respect to input.
 
+    All class gradients come from a single forward pass: ``jacrev`` vmaps
+    the per-class backward passes instead of looping over classes.
+
     Parameters
     ----------
     model : nn.Module
         Classifier in eval mode.
     x : torch.Tensor
-        Input tensor of shape (1, 1, 28, 28) with requires_grad=True.
+        Input tensor of shape (1, 1, 28, 28).
 
     Returns
     -------
     torch.Tensor
-        Jacobian matrix of shape (10, 784) where entry [k, i] is dF_k/dx_i.
+        Jacobian matrix of shape (10, 784) where entry [k, i] is dF_k/dx_i,
+        on the same device as ``x``.
     """
-    x_flat = x.view(-1)  # Flatten to (784,)
-    num_classes = 10
-    num_features = x_flat.shape[0]
-
-    jacobian = torch.zeros(num_classes, num_features)
-
-    # Compute gradient for each class
-    for k in range(num_classes):
-        if x.grad is not None:
-            x.grad.zero_()
-
-        # Forward pass to get logits
-        logits = model(mnist_normalize(x))
 
-        # Select k-th class logit
-        selected = logits[0, k]
+    def class_scores(x_single: torch.Tensor) -> torch.Tensor:
+        return model(mnist_normalize(x_single.unsqueeze(0)))[0]
 
-        # Backward pass
-        selected.backward(retain_graph=True)
-
-        # Store gradient
-        jacobian[k] = x.grad.view(-1).clone()
-
-    return jacobian
+    jacobian = jacrev(class_scores)(x.detach()[0])  # (10, 1, 28, 28)
+    return jacobian.detach().reshape(jacobian.shape[0], -1)
 
 def compute_saliency_map(
     jacobian: torch.Tensor, target: int, search_space: torch.Tensor
@@ -224,6 +211,8 @@ def compute_pairwise_saliency(
         Either ``"increase"`` or ``"decrease"`` to signal the perturbation sign.
     top_k : Optional[int]
         Optional cap on the number of candidate features considered per pair.
+        Pairs are scored as one (k, k) tensor, so ``None`` (the whole search
+        space) stays cheap for MNIST-sized inputs.
 
     Returns
     -------
@@ -245,35 +234,27 @@ def compute_pairwise_saliency(
         _, top_idx = torch.topk(prelim, top_k)
         valid = valid[top_idx]
 
-    best_score = 0.0
-    best_pair = (-1, -1)
+    # Score every candidate pair at once: (k, k) sums via broadcasting, keeping
+    # only p < q pairs whose sums point in the requested direction
+    alpha = target_grad[valid]
+    beta = other_grad[valid]
+    alpha_sum = alpha[:, None] + alpha[None, :]
+    beta_sum = beta[:, None] + beta[None, :]
 
-    for i in range(valid.numel()):
-        p = int(valid[i].item())
-        alpha_p = target_grad[p]
-        beta_p = other_grad[p]
-        for j in range(i + 1, valid.numel()):
-            q = int(valid[j].item())
-            alpha_sum = alpha_p + target_grad[q]
-            beta_sum = beta_p + other_grad[q]
-
-            if direction == "increase":
-                if alpha_sum <= 0 or beta_sum >= 0:
-                    continue
-                score = alpha_sum * torch.abs(beta_sum)
-            else:
-                if alpha_sum >= 0 or beta_sum <= 0:
-                    continue
-                score = torch.abs(alpha_sum) * beta_sum
-
-            score_val = float(score.item())
-            if score_val > best_score:
-                best_score = score_val
-                best_pair = (p, q)
+    if direction == "increase":
+        ok = (alpha_sum > 0) & (beta_sum < 0)
+    else:
+        ok = (alpha_sum < 0) & (beta_sum > 0)
+    ok &= torch.ones_like(ok).triu(diagonal=1)
 
-    if best_pair[0] == -1:
+    scores = torch.where(ok, torch.abs(alpha_sum) * torch.abs(beta_sum), torch.zeros_like(alpha_sum))
+    best = int(torch.argmax(scores).item())
+    best_score = float(scores.view(-1)[best].item())
+    if best_score <= 0.0:
         return -1, -1, 0.0
-    return best_pair[0], best_pair[1], best_score
+
+    i, j = divmod(best, valid.numel())
+    return int(valid[i].item()), int(valid[j].item()), best_score
 
 
 # ------------- JSMA Targeted Attack Implementation --------------
@@ -311,9 +292,25 @@ def jsma_targeted(
     x_orig = torch.from_numpy(x01.copy()).float()
     x_adv = x_orig.clone()
 
-    # Track modified pixels
+    # Attack state, updated only for the pixels touched in each step:
+    # candidate features, which pixels differ from the original, and how many
     num_features = 28 * 28
     search_space = torch.ones(num_features, dtype=torch.bool)
+    modified = torch.zeros(num_features, dtype=torch.bool)
+    pixels_modified = 0
+    x_orig_flat = x_orig.view(-1)
+
+    def _update_pixel(x_flat: torch.Tensor, idx: int) -> None:
+        nonlocal pixels_modified
+        value = float(x_flat[idx].item())
+        # Prune saturated pixels from the search space immediately so
+        # subsequent saliency computations ignore them.
+        if value <= 0.0 or value >= 1.0:
+            search_space[idx] = False
+        now_modified = abs(value - float(x_orig_flat[idx].item())) > 1e-6
+        if now_modified != bool(modified[idx].item()):
+            modified[idx] = now_modified
+            pixels_modified += 1 if now_modified else -1
 
     for iteration in range(max_iters):
         # Check if we've achieved target misclassification
@@ -327,10 +324,6 @@ def jsma_targeted(
             print(f"Success at iteration {iteration}: predicted class = {target_class}")
             break
 
-        # Count actually modified pixels (those different from original)
-        x_diff = torch.abs(x_adv - x_orig).view(-1)
-        pixels_modified = (x_diff > 1e-6).sum().item()
-
         if iteration % 100 == 0:
             print(
                 f"Iter {iteration}: pred={pred}, target_prob={target_prob:.3f}, pixels_modified={pixels_modified}"
@@ -343,8 +336,7 @@ def jsma_targeted(
             break
 
         # Compute Jacobian and saliency information
-        x_adv_grad = x_adv.clone().requires_grad_(True)
-        jacobian = compute_jacobian(model, x_adv_grad)
+        jacobian = compute_jacobian(model, x_adv)
         saliency_inc, saliency_dec = compute_saliency_map(
             jacobian, target_class, search_space
         )
@@ -367,12 +359,11 @@ def jsma_targeted(
             best_pair_score = pair_dec_score
             best_pair_increase = False
 
-        current_mask = x_diff > 1e-6
         budget_remaining = l0_budget - pixels_modified
         required_budget = sum(
             1
             for idx in best_pair_indices
-            if idx >= 0 and not bool(current_mask[idx].item())
+            if idx >= 0 and not bool(modified[idx].item())
         )
         use_pair = (
             best_pair_score > 0.0
@@ -387,10 +378,7 @@ def jsma_targeted(
                 if idx < 0:
                     continue
                 x_adv_flat[idx] = torch.clamp(x_adv_flat[idx] + step, 0.0, 1.0)
-                # Prune saturated pixels from the search space immediately so
-                # subsequent saliency computations ignore them.
-                if x_adv_flat[idx] <= 0.0 or x_adv_flat[idx] >= 1.0:
-                    search_space[idx] = False
+                _update_pixel(x_adv_flat, idx)
             x_adv = x_adv_flat.view(1, 1, 28, 28)
             continue
 
@@ -405,9 +393,7 @@ def jsma_targeted(
         else:
             idx = saliency_dec.argmax().item()
             x_adv_flat[idx] = torch.clamp(x_adv_flat[idx] - theta, 0.0, 1.0)
-        # Prune saturated pixel after single-pixel update
-        if x_adv_flat[idx] <= 0.0 or x_adv_flat[idx] >= 1.0:
-            search_space[idx] = False
+        _update_pixel(x_adv_flat, idx)
         x_adv = x_adv_flat.view(1, 1, 28, 28)
 
     return x_adv.detach().cpu().numpy()
@@ -1,13 +1,35 @@
 #!/usr/bin/env python3
 import argparse
+import base64
+import binascii
 import hashlib
+import hmac
+import http.server
 import time
 import gzip
+import json
+import math
+import mmap
 import os
+import signal
+import socket
+import socketserver
+import string
+import struct
 import sys
-from multiprocessing import Pool, cpu_count
+import threading
+from array import array
+from collections import Counter, namedtuple
+from multiprocessing import Pool, RawArray, RawValue, cpu_count
 from tqdm import tqdm
 
+# Try to import cryptography for its OpenSSL PBKDF2 backend
+try:
+    from cryptography.hazmat.primitives import hashes as crypto_hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+except ImportError:
+    PBKDF2HMAC = None
+
 # Try to import colorama for colored output
 try:
     from colorama import Fore, Style, init as colorama_init
@@ -30,18 +52,495 @@ def color(text, color_key, enable=True):
     return text
 
 
-# Rule-based mangling (basic)
-def mangle(word):
-    rules = [
-        lambda w: w,
-        lambda w: w.capitalize(),
-        lambda w: w.upper(),
-        lambda w: w + "123",
-        lambda w: w + "1",
-        lambda w: w[::-1],
-        lambda w: w + "!",
-    ]
-    return [rule(word) for rule in rules]
+# Rule engine (hashcat/John-style rule functions)
+# The built-in set mirrors the original basic mangling: as-is, Capitalize,
+# UPPER, +"123", +"1", reversed, +"!".
+DEFAULT_RULES = [":", "c", "u", "$1 $2 $3", "$1", "r", "$!"]
+
+
+def _rule_pos(ch):
+    if ch.isdigit():
+        return int(ch)
+    if "A" <= ch <= "Z":
+        return ord(ch) - ord("A") + 10
+    raise ValueError(f"Invalid rule position {ch!r}")
+
+
+def _toggle_at(n):
+    return lambda w: w[:n] + w[n].swapcase() + w[n + 1:] if n < len(w) else w
+
+
+def _shift_char_at(n, delta):
+    return lambda w: w[:n] + chr((ord(w[n]) + delta) % 0x110000) + w[n + 1:] if n < len(w) else w
+
+
+def _swap_at(n, m):
+    def op(w):
+        if n >= len(w) or m >= len(w):
+            return w
+        chars = list(w)
+        chars[n], chars[m] = chars[m], chars[n]
+        return "".join(chars)
+    return op
+
+
+def _title(sep):
+    return lambda w: sep.join(part[:1].upper() + part[1:] for part in w.lower().split(sep))
+
+
+# Function name -> (argument spec, builder). In the spec, "N"/"M" are
+# positions (0-9, A-Z) and "X"/"Y" literal characters. Builders return a
+# str -> str op, or str -> None for rejection rules.
+RULE_FUNCTIONS = {
+    ":": ("", lambda: lambda w: w),
+    "l": ("", lambda: str.lower),
+    "u": ("", lambda: str.upper),
+    "c": ("", lambda: lambda w: w[:1].upper() + w[1:].lower()),
+    "C": ("", lambda: lambda w: w[:1].lower() + w[1:].upper()),
+    "t": ("", lambda: str.swapcase),
+    "T": ("N", _toggle_at),
+    "E": ("", lambda: _title(" ")),
+    "e": ("X", _title),
+    "r": ("", lambda: lambda w: w[::-1]),
+    "d": ("", lambda: lambda w: w + w),
+    "p": ("N", lambda n: lambda w: w * (n + 1)),
+    "f": ("", lambda: lambda w: w + w[::-1]),
+    "{": ("", lambda: lambda w: w[1:] + w[:1]),
+    "}": ("", lambda: lambda w: w[-1:] + w[:-1]),
+    "$": ("X", lambda x: lambda w: w + x),
+    "^": ("X", lambda x: lambda w: x + w),
+    "[": ("", lambda: lambda w: w[1:]),
+    "]": ("", lambda: lambda w: w[:-1]),
+    "D": ("N", lambda n: lambda w: w[:n] + w[n + 1:]),
+    "x": ("NM", lambda n, m: lambda w: w[n:n + m] if n + m <= len(w) else w),
+    "O": ("NM", lambda n, m: lambda w: w[:n] + w[n + m:] if n + m <= len(w) else w),
+    "i": ("NX", lambda n, x: lambda w: w[:n] + x + w[n:] if n <= len(w) else w),
+    "o": ("NX", lambda n, x: lambda w: w[:n] + x + w[n + 1:] if n < len(w) else w),
+    "'": ("N", lambda n: lambda w: w[:n]),
+    "s": ("XY", lambda x, y: lambda w: w.replace(x, y)),
+    "@": ("X", lambda x: lambda w: w.replace(x, "")),
+    "z": ("N", lambda n: lambda w: w[:1] * n + w),
+    "Z": ("N", lambda n: lambda w: w + w[-1:] * n),
+    "q": ("", lambda: lambda w: "".join(ch + ch for ch in w)),
+    "k": ("", lambda: lambda w: w[1::-1] + w[2:] if len(w) >= 2 else w),
+    "K": ("", lambda: lambda w: w[:-2] + w[:-3:-1] if len(w) >= 2 else w),
+    "*": ("NM", _swap_at),
+    "y": ("N", lambda n: lambda w: w[:n] + w if n <= len(w) else w),
+    "Y": ("N", lambda n: lambda w: w + w[len(w) - n:] if n <= len(w) else w),
+    "+": ("N", lambda n: _shift_char_at(n, 1)),
+    "-": ("N", lambda n: _shift_char_at(n, -1)),
+    ".": ("N", lambda n: lambda w: w[:n] + w[n + 1] + w[n + 1:] if n + 1 < len(w) else w),
+    ",": ("N", lambda n: lambda w: w[:n] + w[n - 1] + w[n + 1:] if 0 < n < len(w) else w),
+    # Rejection rules
+    "<": ("N", lambda n: lambda w: w if len(w) <= n else None),
+    ">": ("N", lambda n: lambda w: w if len(w) >= n else None),
+    "_": ("N", lambda n: lambda w: w if len(w) == n else None),
+    "!": ("X", lambda x: lambda w: None if x in w else w),
+    "/": ("X", lambda x: lambda w: w if x in w else None),
+    "(": ("X", lambda x: lambda w: w if w.startswith(x) else None),
+    ")": ("X", lambda x: lambda w: w if w.endswith(x) else None),
+    "=": ("NX", lambda n, x: lambda w: w if w[n:n + 1] == x else None),
+    "%": ("NX", lambda n, x: lambda w: w if w.count(x) >= n else None),
+}
+
+
+def compile_rule(rule):
+    """Parse one rule line into a tuple of ops applied left to right."""
+    ops = []
+    i = 0
+    while i < len(rule):
+        name = rule[i]
+        i += 1
+        if name in " \t":
+            continue
+        if name not in RULE_FUNCTIONS:
+            raise ValueError(f"Unsupported rule function {name!r}")
+        spec, build = RULE_FUNCTIONS[name]
+        if i + len(spec) > len(rule):
+            raise ValueError(f"Missing argument for rule function {name!r}")
+        params = [_rule_pos(rule[i + j]) if kind in "NM" else rule[i + j] for j, kind in enumerate(spec)]
+        i += len(spec)
+        if name != ":":
+            ops.append(build(*params))
+    return tuple(ops)
+
+
+def load_rules(path):
+    """Read a rule file, returning (rules, [(line number, error)])."""
+    rules, errors = [], []
+    with open(path, "r", errors="ignore") as f:
+        for lineno, line in enumerate(f, 1):
+            rule = line.rstrip("\r\n")
+            if not rule.strip() or rule.startswith("#"):
+                continue
+            try:
+                compile_rule(rule)
+                rules.append(rule)
+            except ValueError as e:
+                errors.append((lineno, e))
+    return rules, errors
+
+
+def apply_rules(word, compiled):
+    """Yield the distinct candidates the compiled rules produce for one word."""
+    seen = set()
+    for ops in compiled:
+        candidate = word
+        for op in ops:
+            candidate = op(candidate)
+            if candidate is None:
+                break
+        if candidate is not None and candidate not in seen:
+            seen.add(candidate)
+            yield candidate
+
+
+# Streaming wordlist ingestion
+WORDLIST_CHUNK_SIZE = 1 << 20
+
+
+def open_wordlist(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_wordlist(path, start_offset=0, chunk_size=WORDLIST_CHUNK_SIZE):
+    """Yield (byte offset, word) from a txt/gz wordlist, reading it in fixed-size chunks.
+
+    Offsets are positions in the decompressed stream, so a run can be resumed
+    from any line start via start_offset.
+    """
+    with open_wordlist(path) as f:
+        if start_offset:
+            f.seek(start_offset)
+        offset = start_offset
+        tail = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                yield offset, line.decode(errors="ignore").strip()
+                offset += len(line) + 1
+        if tail:
+            yield offset, tail.decode(errors="ignore").strip()
+
+
+# Compiled wordlists
+# --compile-wordlist writes a deduplicated binary copy of a wordlist: a header
+# (magic, word count, index offset), the words as length-prefixed UTF-8, then
+# one 8-byte offset per word. Runs mmap it and address words by line number,
+# so there is nothing to decompress or split at startup and workers are handed
+# line ranges instead of pickled words.
+COMPILED_WORDLIST_MAGIC = b"PBKDF2WL"
+COMPILED_HEADER = struct.Struct("<8sQQ")
+COMPILED_LENGTH = struct.Struct("<H")
+COMPILED_OFFSET = struct.Struct("<Q")
+
+
+def compile_wordlist(src, dst, order=None):
+    """Compile a txt/gz wordlist into dst, dropping empty and duplicate words.
+
+    order is None to keep file order, or "frequency"/"markov" (see
+    order_words). Returns (words read, words written).
+    """
+    counts = Counter()
+    read = 0
+    for _, word in iter_wordlist(src):
+        read += 1
+        if word and len(word.encode()) <= 0xFFFF:
+            counts[word] += 1
+    words = order_words(counts, order) if order else counts
+    offsets = array("Q")
+    tmp = dst + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(COMPILED_HEADER.pack(COMPILED_WORDLIST_MAGIC, 0, 0))
+        pos = COMPILED_HEADER.size
+        for word in words:
+            raw = word.encode()
+            offsets.append(pos)
+            f.write(COMPILED_LENGTH.pack(len(raw)))
+            f.write(raw)
+            pos += COMPILED_LENGTH.size + len(raw)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        f.write(offsets.tobytes())
+        f.seek(0)
+        f.write(COMPILED_HEADER.pack(COMPILED_WORDLIST_MAGIC, len(offsets), pos))
+    os.replace(tmp, dst)
+    return read, len(offsets)
+
+
+def is_compiled_wordlist(path):
+    with open(path, "rb") as f:
+        return f.read(len(COMPILED_WORDLIST_MAGIC)) == COMPILED_WORDLIST_MAGIC
+
+
+class CompiledWordlist:
+    """Read-only, memory-mapped view of a compiled wordlist, indexed by line number."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        magic, self._count, self._index = COMPILED_HEADER.unpack_from(self._mm)
+        if magic != COMPILED_WORDLIST_MAGIC:
+            raise ValueError(f"{path} is not a compiled wordlist")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, line):
+        offset, = COMPILED_OFFSET.unpack_from(self._mm, self._index + line * COMPILED_OFFSET.size)
+        length, = COMPILED_LENGTH.unpack_from(self._mm, offset)
+        start = offset + COMPILED_LENGTH.size
+        # Decode straight from the mapped pages, without an intermediate bytes copy.
+        return str(self._view[start:start + length], "utf-8")
+
+
+# Candidate ordering
+# With slow hashes the order candidates are tried in matters more than raw
+# speed. Compiled wordlists can be sorted by how often a word occurs in the
+# source list or by a character-bigram (Markov) model fitted to it, and rules
+# can be tried in order of how many hashes each has cracked before. Every hit
+# is credited to the first rule that produced it, in the rule stats file.
+WORDLIST_ORDERS = ["frequency", "markov"]
+MARKOV_UNSEEN = math.log(1e-6)
+DEFAULT_RULE_STATS = "pbkdf2crack.rulestats"
+
+
+def train_markov(counts):
+    """Fit a character bigram model to {word: occurrences}.
+
+    Returns {(previous char, char): log probability}; "" marks the start and
+    end of a word.
+    """
+    pairs = Counter()
+    for word, count in counts.items():
+        chars = ["", *word, ""]
+        for pair in zip(chars, chars[1:]):
+            pairs[pair] += count
+    totals = Counter()
+    for (prev, _), count in pairs.items():
+        totals[prev] += count
+    return {pair: math.log(count / totals[pair[0]]) for pair, count in pairs.items()}
+
+
+def markov_score(model, word):
+    chars = ["", *word, ""]
+    return sum(model.get(pair, MARKOV_UNSEEN) for pair in zip(chars, chars[1:]))
+
+
+def order_words(counts, order):
+    """Sort {word: occurrences} most likely first; ties keep file order."""
+    if order == "frequency":
+        return sorted(counts, key=counts.get, reverse=True)
+    model = train_markov(counts)
+    return sorted(counts, key=lambda word: markov_score(model, word), reverse=True)
+
+
+def load_rule_stats(path):
+    """Return a Counter of hashes cracked per rule."""
+    if not path or not os.path.exists(path):
+        return Counter()
+    with open(path) as f:
+        return Counter(json.load(f))
+
+
+def save_rule_stats(path, hits):
+    """Atomically add this run's per-rule hits to the stats file."""
+    stats = load_rule_stats(path)
+    stats.update(hits)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(dict(stats.most_common()), f, indent=1)
+    os.replace(tmp, path)
+
+
+def order_rules(rules, stats):
+    """Sort rules by recorded hits, most productive first; ties keep file order."""
+    return sorted(rules, key=lambda rule: stats[rule], reverse=True)
+
+
+def rule_source(word, password, rules, compiled):
+    """Return the first rule that turns word into password."""
+    for rule, ops in zip(rules, compiled):
+        if password in apply_rules(word, [ops]):
+            return rule
+    return None
+
+
+# Mask and hybrid attacks
+MASK_CHARSETS = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "s": " " + string.punctuation,
+    "a": string.ascii_lowercase + string.ascii_uppercase + string.digits + " " + string.punctuation,
+    "h": "0123456789abcdef",
+    "H": "0123456789ABCDEF",
+    "?": "?",
+}
+
+
+def parse_mask(mask):
+    """Parse a ?l?u?d?s-style mask into one charset string per position."""
+    charsets = []
+    i = 0
+    while i < len(mask):
+        if mask[i] != "?":
+            charsets.append(mask[i])
+            i += 1
+            continue
+        key = mask[i + 1:i + 2]
+        if not key:
+            raise ValueError("Mask ends with a bare '?'")
+        if key not in MASK_CHARSETS:
+            raise ValueError(f"Unknown mask charset ?{key}")
+        charsets.append(MASK_CHARSETS[key])
+        i += 2
+    if not charsets:
+        raise ValueError("Empty mask")
+    return charsets
+
+
+def mask_keyspace(charsets):
+    return math.prod(len(charset) for charset in charsets)
+
+
+def iter_mask(charsets, start, end):
+    """Yield the mask candidates with keyspace indices [start, end).
+
+    The last position varies fastest, so index i is the mixed-radix number
+    whose digits select a character from each position's charset.
+    """
+    digits = []
+    index = start
+    for charset in reversed(charsets):
+        index, digit = divmod(index, len(charset))
+        digits.append(digit)
+    digits.reverse()
+    chars = [charset[d] for charset, d in zip(charsets, digits)]
+    positions = range(len(charsets) - 1, -1, -1)
+    for _ in range(end - start):
+        yield "".join(chars)
+        for pos in positions:
+            digit = digits[pos] + 1
+            if digit < len(charsets[pos]):
+                digits[pos] = digit
+                chars[pos] = charsets[pos][digit]
+                break
+            digits[pos] = 0
+            chars[pos] = charsets[pos][0]
+
+
+# Password policy filtering
+# Candidates that the target's password policy would have rejected are
+# dropped in the worker before any PBKDF2 work is spent on them.
+POLICY_CLASSES = "luds"
+_CHAR_CLASS = {ch: key for key in "lud" for ch in MASK_CHARSETS[key]}
+
+
+def parse_classes(value):
+    """Parse --require-classes: class letters ("lud") or how many of luds are needed ("3").
+
+    Returns (classes, how many of them a candidate must contain).
+    """
+    if value.isdigit():
+        count = int(value)
+        if not 1 <= count <= len(POLICY_CLASSES):
+            raise argparse.ArgumentTypeError(f"class count must be between 1 and {len(POLICY_CLASSES)}")
+        return POLICY_CLASSES, count
+    if not value or set(value) - set(POLICY_CLASSES):
+        raise argparse.ArgumentTypeError(f"expected a count or letters from {POLICY_CLASSES}, got {value!r}")
+    classes = "".join(sorted(set(value), key=POLICY_CLASSES.index))
+    return classes, len(classes)
+
+
+def make_policy(min_len, max_len, classes, min_classes):
+    """Return a predicate accepting the candidates allowed by the policy."""
+    wanted = set(classes)
+
+    def accept(password):
+        if not min_len <= len(password) <= max_len:
+            return False
+        if min_classes:
+            present = {_CHAR_CLASS.get(ch, "s") for ch in password}
+            return len(present & wanted) >= min_classes
+        return True
+
+    return accept
+
+
+# Keyspace indexing
+# Every attack is base words x an amplifier: the rule list (wordlist mode) or
+# the mask keyspace (hybrid modes, and mask mode with a single empty word).
+# A keyspace position is a (word byte offset, word line number, amplifier
+# index) triple.
+def parse_node(value):
+    """Parse an --node "N/M" value into (N, M), 1 <= N <= M."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected N/M, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"node index must be between 1 and {count}")
+    return index, count
+
+
+def iter_tasks(words, amp_count, batch_size, start=(0, 0, 0), node=(1, 1)):
+    """Split (offset, word) pairs into worker tasks of roughly batch_size candidates.
+
+    Each task is (position after the task, words, first index, end index);
+    workers expand it locally, so only base words ever cross the process
+    boundary. Several words share a task when the amplifier fits in
+    batch_size, otherwise each word is split into index ranges.
+
+    Tasks are aligned to absolute line numbers and index ranges, so the stream
+    is identical on every machine and after --restore. Node N of M only
+    yields every M-th task.
+    """
+    step = min(amp_count, batch_size)
+    chunks = -(-amp_count // step)
+    words_per_task = max(1, batch_size // amp_count)
+    node_index, node_count = node
+    _, line, start_index = start
+    line -= 1
+    batch = []
+    offset = 0
+    for offset, word in words:
+        line += 1
+        if start_index or step < amp_count:
+            for chunk in range(start_index // step, chunks):
+                if (line * chunks + chunk) % node_count != node_index - 1:
+                    continue
+                end = min((chunk + 1) * step, amp_count)
+                yield (offset, line, end), [word], max(chunk * step, start_index), end
+            start_index = 0
+            continue
+        if (line // words_per_task) % node_count == node_index - 1:
+            batch.append(word)
+        if batch and (line + 1) % words_per_task == 0:
+            yield (offset, line, amp_count), batch, 0, amp_count
+            batch = []
+    if batch:
+        yield (offset, line, amp_count), batch, 0, amp_count
+
+
+def split_unit(words, first, end, batch_size):
+    """Re-split a coordinator work unit into local worker tasks."""
+    span = end - first
+    if span <= batch_size:
+        step = max(1, batch_size // span)
+        for i in range(0, len(words), step):
+            yield words[i:i + step], first, end
+    else:
+        for word in words:
+            for lo in range(first, end, batch_size):
+                yield [word], lo, min(lo + batch_size, end)
 
 
 def parse_full_hash(full_hash):
@@ -56,32 +555,1042 @@ def parse_full_hash(full_hash):
         raise ValueError(f"Invalid PBKDF2 prefix format: {e}")
 
 
-def check_password(args):
-    password, salt, iterations, target_hash, alg = args
+# Target hashes
+Target = namedtuple("Target", ["hash", "alg", "iterations", "salt", "digest"])
+
+
+def make_target(full_hash, alg, iterations, salt, digest):
+    """Validate decoded hash fields; salt and digest are raw bytes."""
     try:
-        computed = hashlib.pbkdf2_hmac(
-            alg, password.encode(), salt.encode(), iterations
-        ).hex()
-        if computed == target_hash:
-            return password
-    except Exception:
-        pass
-    return None
+        hashlib.new(alg)
+    except ValueError:
+        raise ValueError(f"Unsupported hash algorithm: {alg}")
+    if iterations < 1:
+        raise ValueError(f"Invalid iteration count: {iterations}")
+    if not digest:
+        raise ValueError("Target hash is empty")
+    return Target(full_hash, alg, iterations, salt, digest)
+
+
+def _b64decode(value, what):
+    try:
+        return base64.b64decode(value + "=" * (-len(value) % 4), validate=True)
+    except binascii.Error:
+        raise ValueError(f"{what} is not valid base64: {value}")
+
+
+def _int_field(value, what):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid {what}: {value}")
+
+
+def parse_werkzeug(full_hash):
+    """pbkdf2:sha256:600000$salt$hexdigest (Werkzeug, text salt)."""
+    alg, iterations, salt, digest = parse_full_hash(full_hash)
+    try:
+        raw_digest = bytes.fromhex(digest)
+    except ValueError:
+        raise ValueError(f"Target hash is not valid hex: {digest}")
+    return make_target(full_hash, alg, iterations, salt.encode(), raw_digest)
+
+
+def parse_django(full_hash):
+    """pbkdf2_sha256$870000$salt$b64digest (Django, text salt)."""
+    parts = full_hash.split("$")
+    if len(parts) != 4:
+        raise ValueError(f"Invalid Django hash format. Got {len(parts)} parts, expected 4.")
+    scheme, iterations, salt, digest = parts
+    return make_target(full_hash, scheme[len("pbkdf2_"):], _int_field(iterations, "iteration count"),
+                       salt.encode(), _b64decode(digest, "Digest"))
+
+
+def parse_passlib(full_hash):
+    """$pbkdf2-sha256$29000$ab64salt$ab64digest (passlib; plain $pbkdf2$ is sha1).
+
+    passlib's "adapted base64" uses "." instead of "+" and drops padding.
+    """
+    parts = full_hash.split("$")
+    if len(parts) != 5 or parts[0]:
+        raise ValueError(f"Invalid passlib hash format. Got {len(parts) - 1} fields, expected 4.")
+    _, scheme, iterations, salt, digest = parts
+    alg = scheme.partition("-")[2] or "sha1"
+    return make_target(full_hash, alg, _int_field(iterations, "iteration count"),
+                       _b64decode(salt.replace(".", "+"), "Salt"),
+                       _b64decode(digest.replace(".", "+"), "Digest"))
+
+
+def parse_hashcat(full_hash):
+    """sha256:1000:b64salt:b64digest (hashcat modes 10900, 12000 and 12100)."""
+    parts = full_hash.split(":")
+    if len(parts) != 4:
+        raise ValueError(f"Invalid hashcat PBKDF2 format. Got {len(parts)} parts, expected 4.")
+    alg, iterations, salt, digest = parts
+    return make_target(full_hash, alg, _int_field(iterations, "iteration count"),
+                       _b64decode(salt, "Salt"), _b64decode(digest, "Digest"))
+
+
+HASH_FORMATS = {
+    "werkzeug": parse_werkzeug,
+    "django": parse_django,
+    "passlib": parse_passlib,
+    "hashcat": parse_hashcat,
+}
+
+
+def detect_format(full_hash):
+    if full_hash.startswith("$pbkdf2"):
+        return "passlib"
+    if full_hash.startswith("pbkdf2_"):
+        return "django"
+    if full_hash.startswith("pbkdf2:"):
+        return "werkzeug"
+    if full_hash.count(":") == 3 and "$" not in full_hash:
+        return "hashcat"
+    raise ValueError("Unrecognized hash format (expected Werkzeug, Django, passlib or hashcat PBKDF2)")
+
+
+def format_salt(salt):
+    """Salt as text when printable, else as hex."""
+    text = salt.decode("ascii", errors="replace")
+    return text if text.isprintable() and "\ufffd" not in text else "0x" + salt.hex()
+
+
+def parse_hash(full_hash):
+    """Detect the hash format and decode it into a Target with raw salt/digest bytes."""
+    return HASH_FORMATS[detect_format(full_hash)](full_hash)
+
+
+def load_hash_file(path):
+    """Parse one full hash per line, returning (targets, [(line number, error)])."""
+    targets, errors = [], []
+    with open(path, "r", errors="ignore") as f:
+        for lineno, line in enumerate(f, 1):
+            full_hash = line.strip()
+            if not full_hash:
+                continue
+            try:
+                targets.append(parse_hash(full_hash))
+            except ValueError as e:
+                errors.append((lineno, e))
+    return targets, errors
+
+
+def group_targets(targets):
+    """Group targets sharing (alg, iterations, salt, key length) so each
+    candidate is derived once per group and matched against a digest set.
+
+    Each group is (alg, iterations, salt, dklen, {digest: [hash, ...]}).
+    """
+    groups = {}
+    for t in targets:
+        key = (t.alg, t.iterations, t.salt, len(t.digest))
+        hashes = groups.setdefault(key, {}).setdefault(t.digest, [])
+        if t.hash not in hashes:
+            hashes.append(t.hash)
+    return [key + (digests,) for key, digests in groups.items()]
+
+
+# PBKDF2 backends
+# Every backend has the hashlib.pbkdf2_hmac signature and returns raw bytes,
+# which are compared against pre-decoded target digests.
+BENCHMARK_SECONDS = 1.0
+AUTO_BENCHMARK_SECONDS = 0.05
+AUTO_BENCHMARK_MAX_ITERATIONS = 10000
+
+
+def pbkdf2_hmac_pad(alg, password, salt, iterations, dklen=None):
+    """PBKDF2 with the HMAC inner/outer pads hashed once per password.
+
+    Each PRF call only copies the two keyed hash states and feeds them the
+    previous block, instead of re-keying HMAC every iteration.
+    """
+    inner = hashlib.new(alg)
+    outer = hashlib.new(alg)
+    block_size = inner.block_size
+    if len(password) > block_size:
+        password = hashlib.new(alg, password).digest()
+    key = password.ljust(block_size, b"\0")
+    inner.update(key.translate(hmac.trans_36))
+    outer.update(key.translate(hmac.trans_5C))
+    digest_size = inner.digest_size
+    dklen = dklen or digest_size
+
+    def prf(data):
+        i = inner.copy()
+        i.update(data)
+        o = outer.copy()
+        o.update(i.digest())
+        return o.digest()
+
+    blocks = []
+    for index in range(1, -(-dklen // digest_size) + 1):
+        u = prf(salt + index.to_bytes(4, "big"))
+        acc = int.from_bytes(u, "big")
+        for _ in range(iterations - 1):
+            u = prf(u)
+            acc ^= int.from_bytes(u, "big")
+        blocks.append(acc.to_bytes(digest_size, "big"))
+    return b"".join(blocks)[:dklen]
+
+
+def pbkdf2_hmac_cryptography(alg, password, salt, iterations, dklen=None):
+    algorithm = getattr(crypto_hashes, alg.upper(), None)
+    if algorithm is None:
+        raise ValueError(f"Unsupported hash algorithm for cryptography: {alg}")
+    algorithm = algorithm()
+    kdf = PBKDF2HMAC(algorithm=algorithm, length=dklen or algorithm.digest_size,
+                     salt=salt, iterations=iterations)
+    return kdf.derive(password)
+
+
+PBKDF2_BACKENDS = {"hashlib": hashlib.pbkdf2_hmac, "hmac-pad": pbkdf2_hmac_pad}
+if PBKDF2HMAC is not None:
+    PBKDF2_BACKENDS["cryptography"] = pbkdf2_hmac_cryptography
+
+
+def benchmark_backend(name, alg, iterations, dklen, seconds=BENCHMARK_SECONDS):
+    """Return single-core H/s for one backend, or None if it can't handle alg."""
+    derive = PBKDF2_BACKENDS[name]
+    try:
+        expected = hashlib.pbkdf2_hmac(alg, b"password", b"salt", 1, dklen)
+        if derive(alg, b"password", b"salt", 1, dklen) != expected:
+            return None
+    except (ValueError, TypeError):
+        return None
+    count = 0
+    start = time.perf_counter()
+    while True:
+        derive(alg, b"benchmark%d" % count, b"saltsalt", iterations, dklen)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+def select_backend(alg, iterations, dklen):
+    """Pick the fastest backend from a short benchmark.
+
+    Very high iteration counts are benchmarked at a capped count and scaled,
+    since per-call overhead is negligible there.
+    """
+    bench_iterations = min(iterations, AUTO_BENCHMARK_MAX_ITERATIONS)
+    rates = {}
+    for name in PBKDF2_BACKENDS:
+        rate = benchmark_backend(name, alg, bench_iterations, dklen, AUTO_BENCHMARK_SECONDS)
+        if rate is not None:
+            rates[name] = rate
+    return max(rates, key=rates.get)
+
+
+# Potfile and checkpoints
+DEFAULT_POTFILE = "pbkdf2crack.pot"
+DEFAULT_RESTORE_FILE = "pbkdf2crack.restore"
+DEFAULT_CHECKPOINT_INTERVAL = 60
+
+
+def load_potfile(path, hashes):
+    """Return {hash: password} for any of the given hashes already in the potfile."""
+    found = {}
+    if not path or not os.path.exists(path):
+        return found
+    with open(path, "r", errors="ignore") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            # Both the hash and the password may contain ':', so try every split.
+            sep = line.find(":")
+            while sep != -1:
+                if line[:sep] in hashes:
+                    found[line[:sep]] = line[sep + 1:]
+                    break
+                sep = line.find(":", sep + 1)
+    return found
+
+
+def save_checkpoint(path, argv, position, cracked, rules=None):
+    """Atomically record the command line and the keyspace position reached.
+
+    rules is the rule order in use when it came from the rule stats, which
+    may change before the run is resumed.
+    """
+    offset, line, index = position
+    state = {"argv": argv, "offset": offset, "line": line, "index": index, "cracked": cracked, "rules": rules}
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+    with open(path) as f:
+        state = json.load(f)
+    return (state["argv"], (state["offset"], state["line"], state["index"]), state["cracked"],
+            state.get("rules"))
+
+
+class CheckpointTracker:
+    """Tracks the keyspace position below which every task has finished.
+
+    Tasks finish out of order; the position only advances past a task once
+    every task issued before it has finished too.
+    """
+
+    def __init__(self, position):
+        self.position = position
+        self._ends = {}
+        self._finished = set()
+        self._next = 0
+
+    def add(self, seq, end):
+        self._ends[seq] = end
+
+    def finish(self, seq):
+        self._finished.add(seq)
+        while self._next in self._finished:
+            self._finished.discard(self._next)
+            self.position = self._ends.pop(self._next)
+            self._next += 1
+
+
+class CrackState:
+    """Tracks which target hashes are cracked.
+
+    Fully cracked groups are mirrored into shared memory polled by the
+    workers: one flag per group, plus a counter bumped after every flag
+    change (see check_batch). New cracks are also queued under a lock for
+    the status reporter's timer thread (see take_new).
+    """
+
+    def __init__(self, groups, remaining, cracked):
+        self.remaining = remaining
+        self.cracked = cracked
+        self.rule_hits = Counter()
+        self.cracked_groups = RawArray("b", len(groups))
+        self.epoch = RawValue("i", 0)
+        self._group_of = {h: i for i, group in enumerate(groups) for hashes in group[4].values() for h in hashes}
+        self._group_left = [sum(len(hashes) for hashes in group[4].values()) for group in groups]
+        self._lock = threading.Lock()
+        self._new = []
+
+    def record(self, full_hashes, password, rule=None):
+        """Mark hashes as cracked, returning the ones that were not already.
+
+        rule, if known, is credited with the new cracks.
+        """
+        new = []
+        with self._lock:
+            for full_hash in full_hashes:
+                if full_hash not in self.remaining:
+                    continue
+                self.remaining.discard(full_hash)
+                self.cracked[full_hash] = password
+                new.append(full_hash)
+                group = self._group_of.get(full_hash)
+                if group is None:
+                    continue
+                self._group_left[group] -= 1
+                if not self._group_left[group]:
+                    self.cracked_groups[group] = 1
+                    self.epoch.value += 1
+            self._new.extend(new)
+            if rule is not None:
+                self.rule_hits[rule] += len(new)
+        return new
+
+    def take_new(self):
+        """Return the hashes cracked since the previous call."""
+        with self._lock:
+            new, self._new = self._new, []
+        return new
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+# Machine-readable status
+DEFAULT_STATUS_INTERVAL = 10
+
+
+class StatusReporter:
+    """Counts the work done and publishes it for job schedulers.
+
+    Every interval seconds a snapshot is written as one JSON line to stream,
+    if given; the sampling runs on a timer thread so a stalled job keeps
+    reporting, with a zero rate. serve_metrics() exposes the same numbers as
+    Prometheus text. Rates are per sampling interval; workers are pool pids
+    locally and client addresses on a coordinator. The ETA is based on the
+    keyspace covered against every group, the same count as the progress bar.
+    """
+
+    def __init__(self, state, tracker, total=None, initial=0, stream=None, interval=DEFAULT_STATUS_INTERVAL):
+        self.hashes = self.avoided = self.candidates = self.processed = 0
+        self._state = state
+        self._tracker = tracker
+        self._total = total
+        self._initial = initial
+        self._stream = stream
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._server = None
+        self._start = self._sampled_at = time.time()
+        self._sampled_hashes = self._sampled_processed = 0
+        self._rate = self._processed_rate = 0.0
+        # worker -> [PBKDF2 computations, computations at last sample, H/s]
+        self._workers = {}
+
+    def update(self, worker, computed, avoided, candidates, covered):
+        with self._lock:
+            self.hashes += computed
+            self.avoided += avoided
+            self.candidates += candidates
+            self.processed += covered * len(self._state.cracked_groups)
+            self._workers.setdefault(worker, [0, 0, 0.0])[0] += computed
+
+    def _sample(self):
+        now = time.time()
+        elapsed = now - self._sampled_at or 1e-9
+        self._rate = (self.hashes - self._sampled_hashes) / elapsed
+        self._sampled_hashes = self.hashes
+        self._processed_rate = (self.processed - self._sampled_processed) / elapsed
+        self._sampled_processed = self.processed
+        self._sampled_at = now
+        for counts in self._workers.values():
+            counts[2] = (counts[0] - counts[1]) / elapsed
+            counts[1] = counts[0]
+
+    def _eta(self):
+        if self._total is None or not self._processed_rate:
+            return None
+        return round(max(0.0, (self._total - self._initial - self.processed) / self._processed_rate), 1)
+
+    def snapshot(self, status="running"):
+        """Sample the rates and return a JSON-serialisable status record."""
+        with self._lock:
+            self._sample()
+            offset, line, index = self._tracker.position
+            hits = self._state.take_new()
+            return {
+                "time": round(self._sampled_at, 3),
+                "elapsed": round(self._sampled_at - self._start, 3),
+                "status": status,
+                "hashes": self.hashes,
+                "hash_rate": round(self._rate, 2),
+                "candidates": self.candidates,
+                "avoided": self.avoided,
+                "workers": {str(worker): {"hashes": counts[0], "hash_rate": round(counts[2], 2)}
+                            for worker, counts in self._workers.items()},
+                "position": {"offset": offset, "line": line, "index": index},
+                "eta": self._eta(),
+                "cracked": len(self._state.cracked),
+                "remaining": len(self._state.remaining),
+                "hits": hits,
+            }
+
+    def emit(self, status="running"):
+        record = self.snapshot(status)
+        if self._stream is not None:
+            self._stream.write(json.dumps(record) + "\n")
+            self._stream.flush()
+
+    def metrics(self):
+        """Render the counters as Prometheus text exposition format."""
+        with self._lock:
+            eta = self._eta()
+            lines = [
+                "# TYPE pbkdf2crack_hashes_total counter",
+                f"pbkdf2crack_hashes_total {self.hashes}",
+                "# TYPE pbkdf2crack_candidates_total counter",
+                f"pbkdf2crack_candidates_total {self.candidates}",
+                "# TYPE pbkdf2crack_avoided_total counter",
+                f"pbkdf2crack_avoided_total {self.avoided}",
+                "# TYPE pbkdf2crack_hash_rate gauge",
+                f"pbkdf2crack_hash_rate {self._rate:.2f}",
+                "# TYPE pbkdf2crack_worker_hash_rate gauge",
+                *(f'pbkdf2crack_worker_hash_rate{{worker="{worker}"}} {counts[2]:.2f}'
+                  for worker, counts in self._workers.items()),
+                "# TYPE pbkdf2crack_wordlist_line gauge",
+                f"pbkdf2crack_wordlist_line {self._tracker.position[1]}",
+                "# TYPE pbkdf2crack_cracked gauge",
+                f"pbkdf2crack_cracked {len(self._state.cracked)}",
+                "# TYPE pbkdf2crack_remaining gauge",
+                f"pbkdf2crack_remaining {len(self._state.remaining)}",
+                "# TYPE pbkdf2crack_last_sample_timestamp_seconds gauge",
+                f"pbkdf2crack_last_sample_timestamp_seconds {self._sampled_at:.3f}",
+            ]
+            if eta is not None:
+                lines += ["# TYPE pbkdf2crack_eta_seconds gauge", f"pbkdf2crack_eta_seconds {eta:.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, address):
+        """Serve metrics() over HTTP on address until close()."""
+        reporter = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = reporter.metrics().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(address, Handler)
+        self._server.daemon_threads = True
+        self._threads.append(threading.Thread(target=self._server.serve_forever, daemon=True))
+
+    def start(self):
+        if self._stream is not None or self._server is not None:
+            self._threads.append(threading.Thread(target=self._run, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self.emit()
+
+    def close(self, status):
+        """Stop the timer and endpoint, writing a final record with the run's outcome."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self.emit(status)
+
+
+# Batched worker API
+DEFAULT_BATCH_SIZE = 512
+
+# Per-process target groups, set once by init_worker() instead of being
+# pickled alongside every candidate.
+_worker = {}
+
+
+def init_worker(groups, backends, amplifier, policy, cracked_groups, epoch, wordlist=None):
+    # Interrupts are handled by the parent, which checkpoints and tears down the pool.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _worker["groups"] = [(PBKDF2_BACKENDS[backend],) + group for group, backend in zip(groups, backends)]
+    # Shared memory written by the parent: one flag per fully cracked group,
+    # and a counter bumped after every flag change so workers can poll cheaply.
+    _worker["cracked_groups"] = cracked_groups
+    _worker["epoch"] = epoch
+    # With a compiled wordlist, tasks carry line ranges into this process's own mapping.
+    _worker["wordlist"] = CompiledWordlist(wordlist) if wordlist else None
+    _worker["accept"] = make_policy(*policy) if policy else None
+    kind, spec = amplifier
+    _worker["source"] = lambda word, password, first, end: None
+    if kind == "rules":
+        compiled = [compile_rule(rule) for rule in spec]
+        _worker["expand"] = lambda word, first, end: apply_rules(word, compiled[first:end])
+        _worker["source"] = lambda word, password, first, end: rule_source(
+            word, password, spec[first:end], compiled[first:end])
+    elif kind == "append":
+        _worker["expand"] = lambda word, first, end: (word + m for m in iter_mask(spec, first, end))
+    else:
+        _worker["expand"] = lambda word, first, end: (m + word for m in iter_mask(spec, first, end))
+
+
+# hits is [([hash, ...], password, rule or None), ...]; computed and avoided
+# count PBKDF2 computations, candidates the candidates generated, and covered
+# the keyspace positions (word x rule/mask index) gone through, including
+# duplicate and rejected candidates.
+BatchResult = namedtuple("BatchResult", ["seq", "hits", "computed", "avoided", "candidates", "covered", "worker"])
+
+
+def check_batch(task):
+    """Expand a block of words into candidates and hash them against every target group.
+
+    Groups the parent has flagged as fully cracked are skipped, and the task
+    stops early once every group is cracked. Returns a BatchResult.
+    """
+    seq, words, first, end = task
+    groups = _worker["groups"]
+    cracked_groups = _worker["cracked_groups"]
+    epoch = _worker["epoch"]
+    expand = _worker["expand"]
+    accept = _worker["accept"]
+    if _worker["wordlist"] is not None:
+        words = map(_worker["wordlist"].__getitem__, words)
+    hits = []
+    computed = avoided = candidates = covered = 0
+    seen_epoch = -1
+    for word in words:
+        for password in expand(word, first, end):
+            if epoch.value != seen_epoch:
+                seen_epoch = epoch.value
+                active = [g for g, cracked in zip(groups, cracked_groups) if g[5] and not cracked]
+                if not active:
+                    return BatchResult(seq, hits, computed, avoided, candidates, covered, os.getpid())
+            candidates += 1
+            if accept is not None and not accept(password):
+                avoided += len(active)
+                continue
+            pw = password.encode()
+            for derive, alg, iterations, salt, dklen, digests in active:
+                computed += 1
+                dk = derive(alg, pw, salt, iterations, dklen)
+                if dk in digests:
+                    # Drop the digest locally too, so this worker stops on its
+                    # own hit without waiting for the parent's flag.
+                    hits.append((digests.pop(dk), password, _worker["source"](word, password, first, end)))
+                    if not digests:
+                        seen_epoch = -1
+        covered += end - first
+    return BatchResult(seq, hits, computed, avoided, candidates, covered, os.getpid())
+
+
+def choose_backends(groups, backend):
+    """Return the backend name for each group, benchmarking when backend is "auto"."""
+    if backend != "auto":
+        for alg, iterations, _, dklen, _ in groups:
+            if benchmark_backend(backend, alg, 1, dklen, 0) is None:
+                raise ValueError(f"Backend {backend} does not support {alg}")
+        return [backend] * len(groups)
+    chosen = {}
+    for alg, iterations, _, dklen, _ in groups:
+        if (alg, iterations, dklen) not in chosen:
+            chosen[alg, iterations, dklen] = select_backend(alg, iterations, dklen)
+    return [chosen[alg, iterations, dklen] for alg, iterations, _, dklen, _ in groups]
+
+
+def report_hits(state, hits, sinks, progress, use_color):
+    for full_hashes, password, rule in hits:
+        for full_hash in state.record(full_hashes, password, rule):
+            progress.write(color(f"{full_hash}:{password}", "success", use_color))
+            for sink in sinks:
+                sink.write(f"{full_hash}:{password}\n")
+                sink.flush()
+
+
+def run_local(tasks, groups, backends, amplifier, policy, state, tracker, checkpoint, reporter, sinks, progress,
+              use_color, wordlist=None):
+    """Crack on this machine's worker pool.
+
+    wordlist is the path of a compiled wordlist when tasks carry line ranges
+    instead of words. Returns "exhausted", "cracked" or "interrupted".
+    """
+    def feed():
+        for seq, (end, words, first, end_index) in enumerate(tasks):
+            # Stop feeding the pool once everything is cracked; tasks already
+            # queued return immediately, so the pool drains instead of being killed.
+            if not state.remaining:
+                return
+            tracker.add(seq, end)
+            yield seq, words, first, end_index
+
+    try:
+        with Pool(cpu_count(), initializer=init_worker,
+                  initargs=(groups, backends, amplifier, policy, state.cracked_groups, state.epoch,
+                            wordlist)) as pool:
+            for result in pool.imap_unordered(check_batch, feed()):
+                reporter.update(result.worker, result.computed, result.avoided, result.candidates, result.covered)
+                # The bar counts every keyspace position against every group, whether
+                # it was hashed, rejected by the policy or skipped for a cracked group.
+                progress.update(result.covered * len(groups))
+                report_hits(state, result.hits, sinks, progress, use_color)
+                if state.remaining:
+                    tracker.finish(result.seq)
+                    checkpoint()
+    except KeyboardInterrupt:
+        return "interrupted"
+    return "exhausted" if state.remaining else "cracked"
+
+
+# Distributed cracking
+# A coordinator (--serve) hands out work units from the same deterministic
+# task stream over TCP, and clients (--connect) crack them on their own pool.
+# The protocol is newline-delimited JSON: the coordinator greets each client
+# with the job, then answers every "get" with a "unit", "wait" or "done";
+# clients report each finished unit with a "result".
+COORDINATOR_UNIT_BATCHES = 32
+CLIENT_WAIT_SECONDS = 1.0
+
+
+def parse_address(value):
+    host, sep, port = value.rpartition(":")
+    if not sep or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT, got {value!r}")
+    return host or "0.0.0.0", int(port)
+
+
+def send_message(stream, message):
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def recv_message(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    return json.loads(line)
+
+
+def run_coordinator(address, job, units, state, tracker, checkpoint, reporter, sinks, progress, use_color):
+    """Serve work units to --connect clients until the job is done.
+
+    Units held by a client that disconnects are handed out again, and hits
+    reported by clients are re-derived before they are recorded.
+    Returns "exhausted", "cracked" or "interrupted".
+    """
+    lock = threading.Lock()
+    params = {h: (alg, iterations, bytes.fromhex(salt), bytes.fromhex(digest))
+              for h, alg, iterations, salt, digest in job["targets"]}
+    finished = threading.Event()
+    units = enumerate(units)
+    assigned = {}
+    requeue = []
+    stats = {"exhausted": False}
+
+    def next_unit():
+        if not state.remaining:
+            return {"type": "done"}
+        while requeue:
+            seq = requeue.pop()
+            if seq in assigned:
+                return assigned[seq]
+        for seq, (end, words, first, end_index) in units:
+            tracker.add(seq, end)
+            assigned[seq] = {"type": "unit", "id": seq, "words": words, "first": first, "end": end_index}
+            return assigned[seq]
+        stats["exhausted"] = True
+        if assigned:
+            return {"type": "wait"}
+        # The last result may have come in before the stream ran dry.
+        finished.set()
+        return {"type": "done"}
+
+    def verify_hits(hits):
+        """Keep only the hashes each claimed password really derives, once per group."""
+        verified = []
+        for full_hashes, password, rule in hits:
+            derived = {}
+            confirmed = []
+            for full_hash in full_hashes:
+                if full_hash not in params:
+                    continue
+                alg, iterations, salt, digest = params[full_hash]
+                key = (alg, iterations, salt, len(digest))
+                if key not in derived:
+                    derived[key] = hashlib.pbkdf2_hmac(alg, password.encode(), salt, iterations, len(digest))
+                if derived[key] == digest:
+                    confirmed.append(full_hash)
+            if confirmed:
+                verified.append((confirmed, password, rule))
+        return verified
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            owned = set()
+            client = "%s:%d" % self.client_address[:2]
+            try:
+                send_message(self.wfile, job)
+                while True:
+                    message = recv_message(self.rfile)
+                    if message["type"] == "result":
+                        # Derived outside the lock: a buggy or hostile client must
+                        # not get wrong passwords into the potfile.
+                        hits = verify_hits(message["hits"])
+                        claimed = sum(len(full_hashes) for full_hashes, _, _ in message["hits"])
+                        dropped = claimed - sum(len(full_hashes) for full_hashes, _, _ in hits)
+                        if dropped:
+                            progress.write(color(f"[!] Dropped {dropped} unverified hits from {client}",
+                                                 "error", use_color))
+                    with lock:
+                        if message["type"] == "result":
+                            seq = message["id"]
+                            owned.discard(seq)
+                            reporter.update(client, message["count"], message.get("avoided", 0),
+                                            message.get("candidates", 0), message.get("covered", 0))
+                            progress.update(message.get("covered", 0) * len(state.cracked_groups))
+                            report_hits(state, hits, sinks, progress, use_color)
+                            if assigned.pop(seq, None) is not None:
+                                tracker.finish(seq)
+                                checkpoint()
+                            if not state.remaining or (stats["exhausted"] and not assigned):
+                                finished.set()
+                            continue
+                        reply = next_unit()
+                        if reply["type"] == "unit":
+                            owned.add(reply["id"])
+                        reply = dict(reply, cracked=list(state.cracked))
+                    send_message(self.wfile, reply)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                pass
+            finally:
+                with lock:
+                    requeue.extend(owned)
+
+    class Server(socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+
+    with Server(address, Handler) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            while not finished.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            return "interrupted"
+        finally:
+            server.shutdown()
+    return "exhausted" if state.remaining else "cracked"
+
+
+def run_client(address, batch_size, backend, use_color, verbosity):
+    """Crack work units from a coordinator on the local pool until it says done."""
+    try:
+        sock = socket.create_connection(address)
+    except OSError as e:
+        print(color(f"[-] Cannot connect to coordinator {address[0]}:{address[1]}: {e}", "error", use_color))
+        return
+    rfile = sock.makefile("rb")
+    wfile = sock.makefile("wb")
+    write_lock = threading.Lock()
+    try:
+        job = recv_message(rfile)
+        targets = [Target(h, alg, iterations, bytes.fromhex(salt), bytes.fromhex(digest))
+                   for h, alg, iterations, salt, digest in job["targets"]]
+        groups = group_targets(targets)
+        backends = choose_backends(groups, backend)
+        amplifier = tuple(job["amplifier"])
+        policy = job.get("policy")
+        state = CrackState(groups, {t.hash for t in targets}, {})
+        if verbosity >= 1:
+            print(color(f"[+] Coordinator   : {address[0]}:{address[1]}", "info", use_color))
+            print(color(f"[+] Hashes        : {len(targets)} ({len(groups)} salt groups)", "info", use_color))
+            print(color(f"[+] Backend       : {', '.join(sorted(set(backends)))}", "info", use_color))
+
+        # unit id -> [local tasks left, hits, PBKDF2 computations, computations avoided, candidates,
+        #             keyspace positions covered]
+        pending = {}
+
+        def feed():
+            while True:
+                try:
+                    with write_lock:
+                        send_message(wfile, {"type": "get"})
+                    message = recv_message(rfile)
+                except ConnectionError:
+                    # The coordinator shuts down as soon as the job is done.
+                    return
+                state.record(message.get("cracked", ()), None)
+                if message["type"] == "done":
+                    return
+                if message["type"] == "wait":
+                    time.sleep(CLIENT_WAIT_SECONDS)
+                    continue
+                tasks = list(split_unit(message["words"], message["first"], message["end"], batch_size))
+                pending[message["id"]] = [len(tasks), [], 0, 0, 0, 0]
+                for words, first, end in tasks:
+                    yield message["id"], words, first, end
+
+        start = time.time()
+        hashed = 0
+        with Pool(cpu_count(), initializer=init_worker,
+                  initargs=(groups, backends, amplifier, policy, state.cracked_groups, state.epoch)) as pool, \
+                tqdm(desc="Cracking", unit="hash", disable=verbosity == 0) as progress:
+            for result in pool.imap_unordered(check_batch, feed()):
+                hashed += result.computed
+                progress.update(result.computed)
+                entry = pending[result.seq]
+                entry[0] -= 1
+                entry[1].extend(result.hits)
+                entry[2] += result.computed
+                entry[3] += result.avoided
+                entry[4] += result.candidates
+                entry[5] += result.covered
+                report_hits(state, result.hits, (), progress, use_color)
+                if not entry[0]:
+                    del pending[result.seq]
+                    with write_lock:
+                        send_message(wfile, {"type": "result", "id": result.seq, "hits": entry[1],
+                                             "count": entry[2], "avoided": entry[3], "candidates": entry[4],
+                                             "covered": entry[5]})
+    except KeyboardInterrupt:
+        print(color("[!] Interrupted; the coordinator will reassign unfinished units.", "error", use_color))
+        return
+    except (OSError, ValueError, KeyError) as e:
+        print(color(f"[-] Coordinator connection failed: {e}", "error", use_color))
+        return
+    finally:
+        sock.close()
+
+    duration = time.time() - start
+    speed = hashed / duration if duration else 0
+    if verbosity >= 1:
+        print(color(f"[+] Time: {duration:.2f}s | Hashes: {hashed} | Speed: {speed:.2f} H/s", "info", use_color))
+    print(color("[+] Coordinator finished the job.", "success", use_color))
+
+
+def run_benchmark(params, use_color):
+    """Print single-core H/s for every backend and (alg, iterations, dklen)."""
+    print(color(f"[+] Backends      : {', '.join(PBKDF2_BACKENDS)}", "info", use_color))
+    print(color(f"[+] Workers       : {cpu_count()}", "info", use_color))
+    for alg, iterations, dklen in params:
+        rates = {}
+        for name in PBKDF2_BACKENDS:
+            rate = benchmark_backend(name, alg, iterations, dklen)
+            if rate is None:
+                print(color(f"    {alg:<8} {iterations:>8} it  {name:<13} unsupported", "dim", use_color))
+                continue
+            rates[name] = rate
+            print(f"    {alg:<8} {iterations:>8} it  {name:<13} {rate:>12.2f} H/s per core")
+        if rates:
+            best = max(rates, key=rates.get)
+            print(color(f"[+] Fastest for {alg}/{iterations}: {best} "
+                        f"(~{rates[best] * cpu_count():.2f} H/s on all cores)", "success", use_color))
+
+
+def load_known_plaintexts(path):
+    """Read one known plaintext per line, dropping blanks and duplicates."""
+    with open(path, "r", errors="ignore") as f:
+        return list(dict.fromkeys(line.rstrip("\r\n") for line in f if line.strip()))
+
+
+def run_order_benchmark(words, rules, stats, known, speed, use_color):
+    """Compare where known plaintexts fall in file order and probability order, without hashing.
+
+    The original stream is the wordlist as it is, with the rules in file
+    order; the reordered one sorts words by Markov score and rules by
+    recorded hits. Each plaintext is reached at the position of the first
+    (word, rule) pair producing it, i.e. after position / speed seconds.
+    Every rule is applied to every word once.
+    """
+    model = train_markov(Counter(words))
+    by_score = sorted(range(len(words)), key=lambda line: markov_score(model, words[line]), reverse=True)
+    word_rank = [0] * len(words)
+    for rank, line in enumerate(by_score):
+        word_rank[line] = rank
+    ordered = order_rules(rules, stats)
+    rule_rank = [ordered.index(rule) for rule in rules]
+    compiled = [compile_rule(rule) for rule in rules]
+    targets = set(known)
+    # plaintext -> [position in the original stream, position in the reordered stream]
+    reached = {}
+    for line, word in enumerate(words):
+        for index, ops in enumerate(compiled):
+            candidate = word
+            for op in ops:
+                candidate = op(candidate)
+                if candidate is None:
+                    break
+            if candidate not in targets:
+                continue
+            positions = reached.setdefault(candidate, [math.inf, math.inf])
+            positions[0] = min(positions[0], line * len(rules) + index + 1)
+            positions[1] = min(positions[1], word_rank[line] * len(rules) + rule_rank[index] + 1)
+    keyspace = len(words) * len(rules)
+    print(color(f"[+] Keyspace      : {keyspace} ({len(words)} words x {len(rules)} rules)", "info", use_color))
+    print(color(f"[+] Known         : {len(known)} plaintexts, {len(reached)} in the keyspace", "info", use_color))
+    print(color(f"[+] Speed         : {speed:.2f} candidates/s", "info", use_color))
+    for plaintext in known:
+        if plaintext not in reached:
+            print(color(f"    {plaintext!r:<24} not in keyspace", "dim", use_color))
+            continue
+        original, reordered = reached[plaintext]
+        print(f"    {plaintext!r:<24} original {original:>12} ({original / speed:.1f}s)  "
+              f"reordered {reordered:>12} ({reordered / speed:.1f}s)")
+    if not reached:
+        return
+    for name, column in (("original", 0), ("reordered", 1)):
+        positions = sorted(positions[column] for positions in reached.values())
+        median = positions[len(positions) // 2]
+        early = sum(pos <= keyspace / 100 for pos in positions) / len(positions)
+        print(color(f"[+] {name:<10} median {median / keyspace:>7.2%} ({median / speed:.1f}s)  "
+                    f"found in first 1%: {early:.1%}", "info", use_color))
+    earlier = sum(reordered < original for original, reordered in reached.values())
+    print(color(f"[+] Reached earlier when reordered: {earlier}/{len(reached)}", "success", use_color))
 
 
 def main():
     parser = argparse.ArgumentParser(description="PBKDF2 Cracker (rules, multiprocessing, progress, colors)")
-    parser.add_argument("fullhash", nargs="?", help="Full hash (e.g. pbkdf2:sha256:600000$salt$hash)")
+    parser.add_argument("fullhash", nargs="?",
+                        help="Full hash: Werkzeug pbkdf2:sha256:600000$salt$hex, Django pbkdf2_sha256$..., "
+                             "passlib $pbkdf2-sha256$... or hashcat sha256:iter:b64salt:b64hash")
     parser.add_argument("-s", "--salt", help="Salt value")
     parser.add_argument("-H", "--hash", dest="target_hash", help="Target hash (hex)")
     parser.add_argument("-i", "--iterations", type=int, help="Iteration count")
     parser.add_argument("-a", "--algorithm", default="sha256", choices=["sha1", "sha256", "sha512"], help="Hash algorithm")
-    parser.add_argument("-w", "--wordlist", default="rockyou.txt.gz", help="Wordlist file (txt or gz)")
+    parser.add_argument("-f", "--hash-file", help="File with one full hash per line (multi-hash mode)")
+    parser.add_argument("-w", "--wordlist", default="rockyou.txt.gz", help="Wordlist file (txt, gz or compiled)")
+    parser.add_argument("--compile-wordlist", metavar="OUT",
+                        help="Write a deduplicated, memory-mappable copy of the wordlist to OUT and exit")
+    parser.add_argument("--sort-wordlist", choices=WORDLIST_ORDERS,
+                        help="With --compile-wordlist: put the most frequent or most Markov-likely words first")
+    parser.add_argument("--attack", default="wordlist", choices=["wordlist", "mask", "hybrid-wm", "hybrid-mw"],
+                        help="Candidate source: wordlist+rules, mask, wordlist+mask or mask+wordlist")
+    parser.add_argument("-m", "--mask", help="Mask for mask/hybrid attacks (?l ?u ?d ?s ?a ?h ?H ??)")
+    parser.add_argument("-r", "--rules", help="Hashcat/John-style rule file (default: built-in basic rules)")
+    parser.add_argument("--order-rules", action="store_true", help="Try rules in order of recorded hits")
+    parser.add_argument("--rule-stats",
+                        help=f"File of hashes cracked per rule (default with --order-rules: {DEFAULT_RULE_STATS})")
+    parser.add_argument("--order-benchmark", metavar="KNOWN",
+                        help="Report where each known plaintext in KNOWN falls in file order and probability "
+                             "order, and exit")
+    parser.add_argument("--min-len", type=int, default=0, help="Skip candidates shorter than this")
+    parser.add_argument("--max-len", type=int, help="Skip candidates longer than this")
+    parser.add_argument("--require-classes", type=parse_classes, metavar="CLASSES",
+                        help="Skip candidates missing these classes (e.g. lud), or with fewer than N of luds (e.g. 3)")
+    parser.add_argument("-b", "--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Candidates per worker task")
+    parser.add_argument("-o", "--outfile", help="Append cracked hash:password lines to this file")
+    parser.add_argument("--potfile", default=DEFAULT_POTFILE, help="Potfile of cracked hashes, checked before cracking")
+    parser.add_argument("--no-potfile", action="store_true", help="Do not read or write the potfile")
+    parser.add_argument("--restore", action="store_true", help="Resume the run saved in the restore file")
+    parser.add_argument("--restore-file", default=DEFAULT_RESTORE_FILE, help="Checkpoint file used by --restore")
+    parser.add_argument("--checkpoint-interval", type=int, default=DEFAULT_CHECKPOINT_INTERVAL,
+                        help="Seconds between checkpoints (0 = only on interrupt)")
+    parser.add_argument("--backend", default="auto", choices=["auto"] + sorted(PBKDF2_BACKENDS),
+                        help="PBKDF2 implementation (auto = fastest in a quick benchmark)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Measure H/s of every backend (for the given hash, or sha1/sha256/sha512) and exit")
+    parser.add_argument("--node", type=parse_node, default=(1, 1), metavar="N/M",
+                        help="Only crack this machine's share (node N of M) of the keyspace")
+    parser.add_argument("--serve", type=parse_address, metavar="HOST:PORT",
+                        help="Coordinate --connect clients instead of cracking locally")
+    parser.add_argument("--connect", type=parse_address, metavar="HOST:PORT",
+                        help="Crack work units handed out by a --serve coordinator")
+    parser.add_argument("--status-json", nargs="?", const="-", metavar="FILE",
+                        help="Append periodic JSON status records to FILE (default: stdout, with all other "
+                             "output on stderr)")
+    parser.add_argument("--status-interval", type=float, default=DEFAULT_STATUS_INTERVAL,
+                        help="Seconds between status records")
+    parser.add_argument("--metrics", type=parse_address, metavar="HOST:PORT",
+                        help="Serve Prometheus-style metrics on HOST:PORT while cracking")
     parser.add_argument("--no-color", action="store_true", help="Disable colored output")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
     parser.add_argument("-q", "--quiet", action="store_true", help="Minimal output")
 
-    args = parser.parse_args()
+    argv = sys.argv[1:]
+    args = parser.parse_args(argv)
+
+    start_position = (0, 0, 0)
+    restored = {}
+    restored_rules = None
+    if args.restore:
+        restore_file = args.restore_file
+        try:
+            argv, start_position, restored, restored_rules = load_checkpoint(restore_file)
+        except (OSError, ValueError, KeyError) as e:
+            print(color(f"[-] Cannot load restore file {restore_file}: {e}", "error", not args.no_color))
+            return
+        args = parser.parse_args(argv)
+        args.restore_file = restore_file
+
+    # With status records on stdout, everything else (banners, the progress
+    # bar, hash:password hits) goes to stderr so the JSON stream stays clean.
+    status_stdout = None
+    if args.status_json == "-":
+        status_stdout, sys.stdout = sys.stdout, sys.stderr
 
     use_color = not args.no_color
     verbosity = 1
@@ -90,78 +1599,350 @@ def main():
     elif args.quiet:
         verbosity = 0
 
-    if not args.fullhash and not (args.salt and args.target_hash and args.iterations):
+    if args.connect:
+        run_client(args.connect, args.batch_size, args.backend, use_color, verbosity)
+        return
+
+    if args.sort_wordlist and not args.compile_wordlist:
+        print(color("[!] --sort-wordlist requires --compile-wordlist", "error", use_color))
+        return
+    if args.compile_wordlist:
+        try:
+            if is_compiled_wordlist(args.wordlist):
+                print(color(f"[!] {args.wordlist} is already compiled", "error", use_color))
+                return
+            start = time.time()
+            read, written = compile_wordlist(args.wordlist, args.compile_wordlist, args.sort_wordlist)
+        except (OSError, EOFError) as e:
+            print(color(f"[-] Cannot compile wordlist: {e}", "error", use_color))
+            return
+        print(color(f"[+] Compiled {written} unique words from {read} lines to {args.compile_wordlist} "
+                    f"in {time.time() - start:.2f}s", "success", use_color))
+        return
+
+    have_hash = args.fullhash or args.hash_file or (args.salt and args.target_hash and args.iterations)
+    if args.benchmark and not have_hash:
+        iterations = args.iterations or 1000
+        run_benchmark([(alg, iterations, None) for alg in ("sha1", "sha256", "sha512")], use_color)
+        return
+    if not have_hash:
         parser.print_help()
         return
 
-    # Parse hash
-    if args.fullhash:
+    # Parse hash(es)
+    if args.hash_file:
+        if not os.path.exists(args.hash_file):
+            print(color(f"[-] Hash file not found: {args.hash_file}", "error", use_color))
+            return
+        targets, errors = load_hash_file(args.hash_file)
+        for lineno, e in errors:
+            print(color(f"[!] {args.hash_file}:{lineno}: {e}", "error", use_color))
+        if not targets:
+            print(color("[-] No valid hashes loaded.", "error", use_color))
+            return
+    else:
         try:
-            alg, iterations, salt, target_hash = parse_full_hash(args.fullhash)
+            if args.fullhash:
+                targets = [parse_hash(args.fullhash)]
+            else:
+                # Built from the options directly rather than parsed back out
+                # of a Werkzeug string, so the salt may contain "$".
+                try:
+                    digest = bytes.fromhex(args.target_hash)
+                except ValueError:
+                    raise ValueError(f"Target hash is not valid hex: {args.target_hash}")
+                full_hash = f"pbkdf2:{args.algorithm}:{args.iterations}${args.salt}${args.target_hash}"
+                targets = [make_target(full_hash, args.algorithm, args.iterations, args.salt.encode(), digest)]
         except ValueError as e:
             print(color(f"[!] {e}", "error", use_color))
             return
+
+    if args.benchmark:
+        run_benchmark(sorted({(t.alg, t.iterations, len(t.digest)) for t in targets}), use_color)
+        return
+
+    if args.batch_size < 1:
+        print(color("[!] Batch size must be at least 1", "error", use_color))
+        return
+    if args.status_interval <= 0:
+        print(color("[!] Status interval must be positive", "error", use_color))
+        return
+
+    # Rule hits are only recorded when something uses them.
+    rule_stats = args.rule_stats or (DEFAULT_RULE_STATS if args.order_rules else None)
+    if args.attack == "wordlist":
+        if args.mask:
+            print(color("[!] --mask requires --attack mask, hybrid-wm or hybrid-mw", "error", use_color))
+            return
+        if args.rules:
+            try:
+                rules, errors = load_rules(args.rules)
+            except OSError as e:
+                print(color(f"[-] Cannot read rule file: {e}", "error", use_color))
+                return
+            for lineno, e in errors:
+                print(color(f"[!] {args.rules}:{lineno}: {e}", "error", use_color))
+            if not rules:
+                print(color("[-] No valid rules loaded.", "error", use_color))
+                return
+        else:
+            rules = DEFAULT_RULES
+        file_rules = rules
+        if args.order_rules:
+            try:
+                rules = restored_rules or order_rules(rules, load_rule_stats(rule_stats))
+            except (OSError, ValueError) as e:
+                print(color(f"[-] Cannot read rule stats: {e}", "error", use_color))
+                return
+        amplifier = ("rules", rules)
+        amp_count = len(rules)
     else:
-        alg = args.algorithm
-        iterations = args.iterations
-        salt = args.salt
-        target_hash = args.target_hash
+        if args.rules or args.order_rules or args.order_benchmark:
+            print(color("[!] Rules only apply to --attack wordlist", "error", use_color))
+            return
+        if not args.mask:
+            print(color(f"[!] --attack {args.attack} requires --mask", "error", use_color))
+            return
+        try:
+            charsets = parse_mask(args.mask)
+        except ValueError as e:
+            print(color(f"[!] {e}", "error", use_color))
+            return
+        amplifier = ("prepend" if args.attack == "hybrid-mw" else "append", charsets)
+        amp_count = mask_keyspace(charsets)
+
+    max_len = sys.maxsize if args.max_len is None else args.max_len
+    if args.min_len > max_len:
+        print(color("[!] --min-len is larger than --max-len", "error", use_color))
+        return
+    classes, min_classes = args.require_classes or ("", 0)
+    policy = None
+    if args.min_len or args.max_len is not None or min_classes:
+        policy = (args.min_len, max_len, classes, min_classes)
+
+    remaining = {t.hash for t in targets}
+    total = len(remaining)
+    potfile = None if args.no_potfile else args.potfile
+
+    # Anything already cracked (potfile, or an earlier leg of a restored run) is skipped.
+    cracked = {h: p for h, p in restored.items() if h in remaining}
+    cracked.update(load_potfile(potfile, remaining))
+    remaining -= cracked.keys()
+    groups = group_targets([t for t in targets if t.hash in remaining])
+    backends = []
+    if remaining and not args.serve:
+        try:
+            backends = choose_backends(groups, args.backend)
+        except ValueError as e:
+            print(color(f"[!] {e}", "error", use_color))
+            return
 
     if verbosity >= 1:
-        print(color(f"[+] Algorithm     : {alg}", "info", use_color))
-        print(color(f"[+] Iterations    : {iterations}", "info", use_color))
-        print(color(f"[+] Salt          : {salt}", "info", use_color))
-        print(color(f"[+] Target Hash   : {target_hash}", "info", use_color))
-        print(color(f"[+] Wordlist      : {args.wordlist}", "info", use_color))
+        if args.hash_file:
+            print(color(f"[+] Hash File     : {args.hash_file}", "info", use_color))
+            print(color(f"[+] Hashes        : {total} ({len(groups)} salt groups left)", "info", use_color))
+        else:
+            target = targets[0]
+            print(color(f"[+] Format        : {detect_format(target.hash)}", "info", use_color))
+            print(color(f"[+] Algorithm     : {target.alg}", "info", use_color))
+            print(color(f"[+] Iterations    : {target.iterations}", "info", use_color))
+            print(color(f"[+] Salt          : {format_salt(target.salt)}", "info", use_color))
+            print(color(f"[+] Target Hash   : {target.digest.hex()}", "info", use_color))
+        if args.attack != "mask":
+            print(color(f"[+] Wordlist      : {args.wordlist}", "info", use_color))
+        if args.attack == "wordlist":
+            order = ", ordered by hits" if args.order_rules else ""
+            print(color(f"[+] Rules         : {len(rules)} ({args.rules or 'built-in'}{order})", "info", use_color))
+        else:
+            print(color(f"[+] Mask          : {args.mask} ({amp_count} candidates per word)", "info", use_color))
+        if policy:
+            limits = [f"length >= {args.min_len}"] if args.min_len else []
+            if args.max_len is not None:
+                limits.append(f"length <= {args.max_len}")
+            if min_classes:
+                limits.append(f"{min_classes} of classes {classes}")
+            print(color(f"[+] Policy        : {', '.join(limits)}", "info", use_color))
+        if backends:
+            print(color(f"[+] Backend       : {', '.join(sorted(set(backends)))}", "info", use_color))
+        if args.node != (1, 1):
+            print(color(f"[+] Node          : {args.node[0]}/{args.node[1]}", "info", use_color))
+        if cracked:
+            print(color(f"[+] Already cracked: {len(cracked)}/{total}", "info", use_color))
+        if args.restore:
+            offset, line, index = start_position
+            print(color(f"[+] Restoring at  : offset {offset} (line {line}), index {index}", "info", use_color))
+    if verbosity >= 2:
+        for full_hash, password in cracked.items():
+            print(color(f"{full_hash}:{password}", "dim", use_color))
 
-    if not os.path.exists(args.wordlist):
-        print(color(f"[-] Wordlist file not found: {args.wordlist}", "error", use_color))
+    compiled = None
+    if (remaining or args.order_benchmark) and args.attack != "mask":
+        if not os.path.exists(args.wordlist):
+            print(color(f"[-] Wordlist file not found: {args.wordlist}", "error", use_color))
+            return
+        try:
+            if is_compiled_wordlist(args.wordlist):
+                compiled = CompiledWordlist(args.wordlist)
+        except (OSError, ValueError) as e:
+            print(color(f"[-] Cannot open compiled wordlist: {e}", "error", use_color))
+            return
+        if compiled is not None and verbosity >= 1:
+            print(color(f"[+] Compiled words: {len(compiled)}", "info", use_color))
+
+    if args.order_benchmark:
+        if compiled is not None:
+            words = [compiled[line] for line in range(len(compiled))]
+        else:
+            words = [word for _, word in iter_wordlist(args.wordlist)]
+        try:
+            known = load_known_plaintexts(args.order_benchmark)
+            stats = load_rule_stats(args.rule_stats or DEFAULT_RULE_STATS)
+        except (OSError, ValueError) as e:
+            print(color(f"[-] Cannot load benchmark inputs: {e}", "error", use_color))
+            return
+        target = targets[0]
+        dklen = len(target.digest)
+        backend = select_backend(target.alg, target.iterations, dklen) if args.backend == "auto" else args.backend
+        # Benchmarked at a capped iteration count and scaled, as in select_backend.
+        bench_iterations = min(target.iterations, AUTO_BENCHMARK_MAX_ITERATIONS)
+        rate = benchmark_backend(backend, target.alg, bench_iterations, dklen)
+        if rate is None:
+            print(color(f"[-] Backend {backend} does not support {target.alg}", "error", use_color))
+            return
+        speed = rate * bench_iterations / target.iterations * cpu_count() / len(groups or [1])
+        run_order_benchmark(words, file_rules, stats, known, speed, use_color)
         return
 
-    # Load wordlist
     try:
-        if args.wordlist.endswith(".gz"):
-            with gzip.open(args.wordlist, "rt", errors="ignore") as f:
-                base_words = f.read().splitlines()
-        else:
-            with open(args.wordlist, "r", errors="ignore") as f:
-                base_words = f.read().splitlines()
-    except Exception as e:
-        print(color(f"[-] Error reading wordlist: {e}", "error", use_color))
+        sinks = [open(path, "a") for path in (potfile, args.outfile) if path]
+    except OSError as e:
+        print(color(f"[-] Cannot open output file: {e}", "error", use_color))
         return
 
-    # Apply basic mangling
-    candidates = []
-    for word in base_words:
-        candidates.extend(mangle(word.strip()))
+    state = CrackState(groups, remaining, cracked)
+    tracker = CheckpointTracker(start_position)
+    checkpoint_rules = rules if args.order_rules else None
+    last_checkpoint = time.time()
 
-    if verbosity >= 1:
-        print(color(f"[+] Candidates after mangling: {len(candidates)}", "info", use_color))
+    def checkpoint():
+        nonlocal last_checkpoint
+        if args.checkpoint_interval and time.time() - last_checkpoint >= args.checkpoint_interval:
+            save_checkpoint(args.restore_file, argv, tracker.position, cracked, checkpoint_rules)
+            last_checkpoint = time.time()
 
-    pool_args = [(word, salt, iterations, target_hash, alg) for word in candidates]
+    if args.attack == "mask":
+        # Mask mode is a hybrid attack on a single empty base word.
+        base_words = [(0, "")]
+    elif compiled is not None:
+        # Compiled wordlists are positioned by line number alone. Local workers
+        # look words up themselves; the coordinator has to ship the text.
+        lines = range(start_position[1], len(compiled))
+        base_words = ((line, compiled[line]) for line in lines) if args.serve else zip(lines, lines)
+    else:
+        base_words = iter_wordlist(args.wordlist, start_position[0])
+    batch_size = args.batch_size * COORDINATOR_UNIT_BATCHES if args.serve else args.batch_size
+    tasks = iter_tasks(base_words, amp_count, batch_size, start_position, args.node)
+    if compiled is not None and not args.serve:
+        # A task's lines are consecutive, so a range is all a worker needs.
+        tasks = ((end, range(words[0], words[-1] + 1), first, end_index) for end, words, first, end_index in tasks)
+
+    # Mask mode and compiled wordlists have a keyspace known up front.
+    node_count = args.node[1]
+    if args.attack == "mask":
+        progress_total = -(-amp_count // node_count) * len(groups)
+        progress_initial = start_position[2] // node_count * len(groups)
+    elif compiled is not None:
+        progress_total = -(-len(compiled) * amp_count // node_count) * len(groups)
+        progress_initial = (start_position[1] * amp_count + start_position[2]) // node_count * len(groups)
+    else:
+        progress_total = progress_initial = None
 
-    found = None
+    status_stream = None
+    try:
+        if args.status_json == "-":
+            status_stream = status_stdout
+        elif args.status_json:
+            status_stream = open(args.status_json, "a")
+        reporter = StatusReporter(state, tracker, progress_total, progress_initial or 0, status_stream,
+                                  args.status_interval)
+        if args.metrics:
+            reporter.serve_metrics(args.metrics)
+    except OSError as e:
+        print(color(f"[-] Cannot set up status output: {e}", "error", use_color))
+        for sink in sinks:
+            sink.close()
+        return
+
+    status = "cracked"
     start = time.time()
-    with Pool(cpu_count()) as pool:
-        for result in tqdm(pool.imap_unordered(check_password, pool_args),
-                           total=len(pool_args),
-                           desc="Cracking",
-                           unit="hash",
-                           disable=verbosity == 0):
-            if result:
-                found = result
-                pool.terminate()
-                break
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    reporter.start()
+    try:
+        if remaining:
+            with tqdm(desc="Cracking", unit="hash", total=progress_total, initial=progress_initial or 0,
+                      disable=verbosity == 0) as progress:
+                if args.serve:
+                    if verbosity >= 1:
+                        host, port = args.serve
+                        progress.write(color(f"[+] Serving work units on {host}:{port}", "info", use_color))
+                    job = {
+                        "type": "job",
+                        "targets": [[t.hash, t.alg, t.iterations, t.salt.hex(), t.digest.hex()]
+                                    for t in targets if t.hash in remaining],
+                        "amplifier": amplifier,
+                        "policy": policy,
+                    }
+                    status = run_coordinator(args.serve, job, tasks, state, tracker, checkpoint, reporter,
+                                             sinks, progress, use_color)
+                else:
+                    status = run_local(tasks, groups, backends, amplifier, policy, state, tracker, checkpoint,
+                                       reporter, sinks, progress, use_color,
+                                       args.wordlist if compiled is not None else None)
+    except KeyboardInterrupt:
+        status = "interrupted"
+    except (OSError, EOFError) as e:
+        status = "error"
+        print(color(f"[-] Error reading wordlist: {e}", "error", use_color))
+        return
+    finally:
+        reporter.close(status)
+        for sink in sinks:
+            sink.close()
+        if status_stream not in (None, status_stdout):
+            status_stream.close()
 
+    interrupted = status == "interrupted"
+    if interrupted:
+        try:
+            save_checkpoint(args.restore_file, argv, tracker.position, cracked, checkpoint_rules)
+            print(color(f"[!] Interrupted. Progress saved to {args.restore_file}, resume with --restore",
+                        "error", use_color))
+        except OSError as e:
+            print(color(f"[-] Interrupted, and failed to save checkpoint: {e}", "error", use_color))
+    elif os.path.exists(args.restore_file):
+        os.remove(args.restore_file)
+    if state.rule_hits and rule_stats:
+        try:
+            save_rule_stats(rule_stats, state.rule_hits)
+        except (OSError, ValueError) as e:
+            print(color(f"[-] Cannot update rule stats: {e}", "error", use_color))
+
+    hashed, avoided = reporter.hashes, reporter.avoided
     duration = time.time() - start
-    speed = len(pool_args) / duration if duration else 0
+    speed = hashed / duration if duration else 0
 
     if verbosity >= 1:
-        print(color(f"[+] Time: {duration:.2f}s | Speed: {speed:.2f} H/s", "info", use_color))
+        print(color(f"[+] Time: {duration:.2f}s | Hashes: {hashed} | Speed: {speed:.2f} H/s", "info", use_color))
+        if policy:
+            share = avoided / (hashed + avoided) if hashed + avoided else 0
+            print(color(f"[+] Policy filter: {avoided} PBKDF2 computations avoided ({share:.1%})", "info", use_color))
 
-    if found:
-        print(color(f"[✔] Password found: {found}", "success", use_color))
-    else:
+    if args.hash_file:
+        summary_color = "success" if cracked else "error"
+        print(color(f"[+] Cracked {len(cracked)}/{total} hashes.", summary_color, use_color))
+    elif cracked:
+        print(color(f"[✔] Password found: {cracked[targets[0].hash]}", "success", use_color))
+    elif not interrupted:
         print(color("[-] Password not found.", "error", use_color))
 
 